@@ -3,16 +3,39 @@ Dataset Builder for IaC Analysis
 Combines Terraform code blocks, TerraMetric quality metrics, and GitHub attributes
 """
 
+import bisect
+import collections
+import concurrent.futures
 import os
 import csv
+import functools
 import json
+import logging
+import mmap
+import multiprocessing
+import multiprocessing.util
+import operator
+import queue
+import shutil
 import subprocess
+import tempfile
+import threading
 import time
 import re
-from typing import Dict, List, Any
+from typing import Dict, Iterable, Iterator, List, Any, NamedTuple, Optional, Set, Tuple
 
 import requests
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import orjson  # Optional: parses GitHub responses several times faster than json
+except ImportError:
+    orjson = None
+
+# Per-repository progress goes through logging so it can be filtered (see --quiet)
+log = logging.getLogger(__name__)
 
 # Load environment variables
 load_dotenv()
@@ -24,137 +47,216 @@ FINAL_REPO_LIST_FILE = "iac_repositories_final_filtered.txt"
 OUTPUT_DIR = "output"
 OUTPUT_CSV = os.path.join(OUTPUT_DIR, "iac_dataset.csv")
 TERRAMETRIC_OUTPUT_DIR = os.path.join(OUTPUT_DIR, "terrametric_temp")
+TERRAMETRIC_TIMEOUT = 30  # Seconds allowed per analyzed file
+TERRAMETRIC_MAX_THREADS = 4  # Concurrent one-shot TerraMetric runs per process
 GITHUB_API_URL = "https://api.github.com/repos"
+GITHUB_CACHE_FILE = os.path.join(OUTPUT_DIR, "gh_cache.json")
+GITHUB_CACHE_TTL = 24 * 60 * 60  # Seconds cached attributes are reused without revalidation
+GITHUB_MAX_WORKERS = 8  # Concurrent GitHub API fetches (kept low for secondary rate limits)
+GITHUB_RATE_LIMIT_RETRIES = 3  # Rate-limited requests retried after waiting out the limit
+GITHUB_RATE_LIMIT_RESERVE = 500  # Below this many remaining requests, the rest are spread out
+PARALLEL_PARSE_MIN_FILES = 64  # Parse .tf files in worker processes from this many files
+REPO_MAX_WORKERS = os.cpu_count() or 1  # Repositories analyzed in parallel (one JVM each)
+REPO_MAX_IN_FLIGHT = 2 * REPO_MAX_WORKERS  # Repositories submitted ahead of the one being written
+CSV_FLUSH_ROWS = 1000  # Buffered CSV rows are written once this many have accumulated
+CSV_BUFFER_SIZE = 4 * 1024 * 1024  # Bytes buffered by the output CSV file between writes
+SKIP_DIRS = {".git", "node_modules", "vendor"}  # Never searched for .tf files (nor .terraform*)
 
 # Ensure output directories exist
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 os.makedirs(TERRAMETRIC_OUTPUT_DIR, exist_ok=True)
 
 
-class TerraformCodeExtractor:
-    """Extracts Terraform code blocks from .tf files"""
+# One alternation over all block types, named by block type, so each file is
+# scanned once. The unnamed groups inside each alternative are the block labels.
+# Compiled at import so every worker process compiles it once.
+BLOCK_PATTERN = re.compile(
+    rb'(?P<resource>resource\s+"([^"]+)"\s+"([^"]+)"\s*\{)'
+    rb'|(?P<module>module\s+"([^"]+)"\s*\{)'
+    rb'|(?P<data>data\s+"([^"]+)"\s+"([^"]+)"\s*\{)'
+    rb'|(?P<variable>variable\s+"([^"]+)"\s*\{)'
+    rb'|(?P<output>output\s+"([^"]+)"\s*\{)'
+    rb"|(?P<locals>locals\s*\{)"
+    rb'|(?P<provider>provider\s+"([^"]+)"\s*\{)'
+    rb"|(?P<terraform>terraform\s*\{)"
+)
+BRACE_PATTERN = re.compile(rb"[{}]")
+NEWLINE_PATTERN = re.compile(rb"\n")
 
-    def __init__(self, repo_path: str):
-        self.repo_path = repo_path
+# Last page number in a GitHub Link header
+LAST_PAGE_PATTERN = re.compile(r'page=(\d+)>; rel="last"')
 
-    def extract_blocks(self) -> List[Dict[str, Any]]:
-        """
-        Extract all Terraform resource blocks, modules, data sources, etc.
-        Returns a list of code blocks with metadata
-        """
-        blocks = []
 
-        for root, dirs, files in os.walk(self.repo_path):
-            # Skip .terraform directories
-            dirs[:] = [d for d in dirs if not d.startswith(".terraform")]
+def _loads_json(raw: bytes) -> Any:
+    """Parse a JSON document from raw bytes, with orjson when it is installed."""
+    return orjson.loads(raw) if orjson is not None else json.loads(raw)
 
-            for file in files:
-                if file.endswith(".tf"):
-                    file_path = os.path.join(root, file)
-                    relative_path = os.path.relpath(file_path, self.repo_path)
 
-                    try:
-                        blocks.extend(self._parse_tf_file(file_path, relative_path))
-                    except (OSError, UnicodeDecodeError, ValueError) as e:
-                        print(f"Error parsing {file_path}: {e}")
-                        continue
+def _iter_tf_files(root: str):
+    """
+    Yield .tf file paths under root, top-down like os.walk.
 
-        return blocks
+    Uses os.scandir so directory entries are classified without an extra stat
+    per file, and never descends into SKIP_DIRS or .terraform* directories.
+    """
+    subdirs = []
+    try:
+        with os.scandir(root) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in SKIP_DIRS and not entry.name.startswith(".terraform"):
+                        subdirs.append(entry.path)
+                elif entry.name.endswith(".tf") and entry.is_file():
+                    yield entry.path
+    except OSError:
+        return
+
+    for path in subdirs:
+        yield from _iter_tf_files(path)
+
+
+def _parse_tf_file(file_path: str, relative_path: str) -> List[Dict[str, Any]]:
+    """
+    Parse a single .tf file and extract blocks.
 
-    def _parse_tf_file(self, file_path: str, relative_path: str) -> List[Dict[str, Any]]:
-        """Parse a single .tf file and extract blocks"""
-        blocks = []
+    The file is memory-mapped and scanned as bytes, so it is never copied into a
+    Python string; only the extracted blocks are decoded. Module-level so it can
+    be pickled and run in worker processes. Errors are reported and yield no
+    blocks, so one bad file does not abort a parallel run.
+    """
+    try:
+        with open(file_path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return []
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as content:
+                return _parse_tf_content(content, relative_path)
+    except (OSError, ValueError) as e:
+        print(f"Error parsing {file_path}: {e}")
+        return []
+
+
+def _parse_tf_content(content: bytes, relative_path: str) -> List[Dict[str, Any]]:
+    """Extract blocks from the raw bytes of a .tf file."""
+    blocks = []
+
+    # Offsets of every newline, so offsets map to line numbers by bisection
+    newlines = [m.start() for m in NEWLINE_PATTERN.finditer(content)]
+
+    # Closing brace of every opening brace, found in one pass over the file
+    closing = _match_braces(content)
+
+    for match in BLOCK_PATTERN.finditer(content):
+        block_type = match.lastgroup
+        start_pos = match.start()
+
+        # Find the corresponding closing brace of the block's opening brace
+        end_pos = closing.get(match.end() - 1, -1)
+
+        if end_pos > 0:
+            start_line = bisect.bisect_left(newlines, start_pos) + 1
+            end_line = bisect.bisect_left(newlines, end_pos - 1) + 1
+            block_content = _decode(content[start_pos:end_pos])
+
+            # Extract block name from the labels, e.g. resource "type" "name"
+            labels = [_decode(group) for group in match.groups() if group is not None][1:]
+            block_name = ".".join(labels) if labels else block_type
+
+            blocks.append(
+                {
+                    "file_path": relative_path,
+                    "block_type": block_type,
+                    "block_name": block_name,
+                    "start_line": start_line,
+                    "end_line": end_line,
+                    "code": block_content,
+                    "loc": end_line - start_line + 1,
+                }
+            )
 
-        with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-            content = f.read()
-            lines = content.split("\n")
-
-        # Regex patterns for different block types
-        patterns = {
-            "resource": r'resource\s+"([^"]+)"\s+"([^"]+)"\s*\{',
-            "module": r'module\s+"([^"]+)"\s*\{',
-            "data": r'data\s+"([^"]+)"\s+"([^"]+)"\s*\{',
-            "variable": r'variable\s+"([^"]+)"\s*\{',
-            "output": r'output\s+"([^"]+)"\s*\{',
-            "locals": r"locals\s*\{",
-            "provider": r'provider\s+"([^"]+)"\s*\{',
-            "terraform": r"terraform\s*\{",
-        }
+    return blocks
 
-        for block_type, pattern in patterns.items():
-            for match in re.finditer(pattern, content):
-                start_pos = match.start()
-                start_line = content[:start_pos].count("\n") + 1
-
-                # Find the corresponding closing brace
-                end_line, block_content = self._extract_block(lines, start_line - 1)
-
-                if end_line > 0:
-                    # Extract block name
-                    if block_type in ["resource", "data"]:
-                        block_name = f"{match.group(1)}.{match.group(2)}"
-                    elif block_type in ["module", "variable", "output", "provider"]:
-                        block_name = match.group(1)
-                    else:
-                        block_name = block_type
-
-                    blocks.append(
-                        {
-                            "file_path": relative_path,
-                            "block_type": block_type,
-                            "block_name": block_name,
-                            "start_line": start_line,
-                            "end_line": end_line,
-                            "code": block_content,
-                            "loc": len(block_content.split("\n")),
-                        }
-                    )
 
-        return blocks
+def _decode(raw: bytes) -> str:
+    """Decode file bytes the way text-mode reading did (lenient UTF-8, LF newlines)."""
+    return raw.decode("utf-8", errors="ignore").replace("\r\n", "\n")
+
 
-    def _extract_block(self, lines: List[str], start_idx: int) -> tuple:
-        """Extract a block by matching braces"""
-        brace_count = 0
-        in_block = False
-        block_lines = []
+def _match_braces(content: bytes) -> Dict[int, int]:
+    """
+    Pair every brace in content in a single pass.
+
+    Maps the offset of each opening brace to the offset just past its closing
+    brace; unclosed braces are absent. Computing this once per file makes each
+    block lookup O(1) instead of rescanning from every block start. Braces inside
+    strings are counted too (simple approach).
+    """
+    closing = {}
+    open_positions = []
+    for brace in BRACE_PATTERN.finditer(content):
+        if brace.group() == b"{":
+            open_positions.append(brace.start())
+        elif open_positions:
+            closing[open_positions.pop()] = brace.end()
+    return closing
+
+
+def _iter_repositories(repo_list_file: str) -> Iterator[str]:
+    """Yield the repository names of a list file (one per line), skipping blank lines."""
+    with open(repo_list_file, "r", encoding="utf-8") as f:
+        for line in f:
+            name = line.strip()
+            if name:
+                yield name
+
+
+class TerraformCodeExtractor:
+    """Extracts Terraform code blocks from .tf files"""
+
+    def __init__(self, repo_path: str, max_workers: Optional[int] = None):
+        """
+        Args:
+            repo_path: Local path to the repository
+            max_workers: Worker processes used to parse files (default: CPU count,
+                1 parses in-process)
+        """
+        self.repo_path = repo_path
+        self.max_workers = max_workers or os.cpu_count() or 1
 
-        for i in range(start_idx, len(lines)):
-            line = lines[i]
-            block_lines.append(line)
+    def extract_blocks(self) -> List[Dict[str, Any]]:
+        """
+        Extract all Terraform resource blocks, modules, data sources, etc.
+        Returns a list of code blocks with metadata
+        """
+        file_paths = []
+        relative_paths = []
 
-            # Count braces (simple approach - doesn't handle strings perfectly)
-            for char in line:
-                if char == "{":
-                    brace_count += 1
-                    in_block = True
-                elif char == "}":
-                    brace_count -= 1
+        for file_path in _iter_tf_files(self.repo_path):
+            file_paths.append(file_path)
+            relative_paths.append(os.path.relpath(file_path, self.repo_path))
 
-                if in_block and brace_count == 0:
-                    return i + 1, "\n".join(block_lines)
+        # Files parse independently; a process pool only pays off for larger repos
+        if self.max_workers == 1 or len(file_paths) < PARALLEL_PARSE_MIN_FILES:
+            per_file_blocks = map(_parse_tf_file, file_paths, relative_paths)
+            return [block for file_blocks in per_file_blocks for block in file_blocks]
 
-        return -1, ""
+        blocks = []
+        with concurrent.futures.ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+            for file_blocks in executor.map(
+                _parse_tf_file, file_paths, relative_paths, chunksize=32
+            ):
+                blocks.extend(file_blocks)
+        return blocks
 
 
 class TerraMetricRunner:
     """Runs TerraMetric on Terraform code blocks"""
 
     def __init__(self):
-        # Try to find Java in common locations
-        java_candidates = [
-            os.environ.get("JAVA_HOME", "") + "/bin/java",
-            "/opt/homebrew/Cellar/openjdk@11/11.0.29/bin/java",
-            "/usr/bin/java",
-            "java",  # Rely on PATH
-        ]
-        self.java_path = None
-        for java in java_candidates:
-            if java and (os.path.exists(java) or java == "java"):
-                self.java_path = java
-                break
-
-        if not self.java_path:
-            self.java_path = "java"  # Fallback to PATH
+        # JAVA_HOME wins when set; otherwise use the first java on PATH
+        java_home = os.environ.get("JAVA_HOME")
+        self.java_path = (
+            (java_home and os.path.join(java_home, "bin", "java")) or shutil.which("java") or "java"
+        )
 
         # Use relative path for TerraMetric JAR
         project_root = os.path.dirname(os.path.abspath(__file__))
@@ -163,6 +265,20 @@ class TerraMetricRunner:
             "terametrics/target/terraform_metrics-1.0-SNAPSHOT-jar-with-dependencies.jar",
         )
 
+        # Scratch directory reused by every batch invocation; created on first use
+        # with a unique name, so runners in parallel workers do not clobber each
+        # other's files, and removed by close()
+        self._tempdir = None
+        # Cleared once a batch report matches none of its files (see analyze_code_batch)
+        self._batch_reports_usable = True
+
+        # Help output of the installed build, used to detect optional features
+        self._help_text = ""
+
+        # Long-lived TerraMetric process (see start_server)
+        self._server = None
+        self._responses = None
+
     def check_installation(self) -> bool:
         """Check if TerraMetric is installed"""
         try:
@@ -177,22 +293,153 @@ class TerraMetricRunner:
                 timeout=10,
                 check=False,
             )
+            self._help_text = result.stdout + result.stderr
             return result.returncode == 0
         except (subprocess.TimeoutExpired, FileNotFoundError):
             return False
 
+    def _supports(self, flag: str) -> bool:
+        """Whether the installed TerraMetric build lists flag in its help output."""
+        return flag in self._help_text
+
+    def start_server(self) -> bool:
+        """
+        Start one long-lived TerraMetric JVM that analyzes files sent over stdin.
+
+        The server reads one JSON request per line ({"path": ...}, or {"code": ...}
+        for builds that also read stdin) and answers with one JSON report per line,
+        so JVM start-up, class loading and JIT warm-up are paid once per run. Only
+        available when the installed TerraMetric build advertises --server in its
+        help output; otherwise analyses stay one-shot.
+
+        Returns True if the server is running.
+        """
+        if self._server is not None:
+            return True
+        if not self._supports("--server"):
+            return False
+
+        try:
+            self._server = subprocess.Popen(
+                [self.java_path, "-jar", self.terrametric_jar, "--server", "--stdio"],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                text=True,
+                bufsize=1,  # Line buffered: one request per line
+            )
+        except OSError as e:
+            print(f"Error starting TerraMetric server: {e}")
+            return False
+
+        # Read responses on a background thread so requests can time out
+        self._responses = queue.Queue()
+        threading.Thread(
+            target=self._read_responses,
+            args=(self._server.stdout, self._responses),
+            daemon=True,
+        ).start()
+        return True
+
+    def close(self):
+        """Shut down the TerraMetric server, if one is running, and remove scratch files."""
+        self._stop_server()
+        tempdir, self._tempdir = self._tempdir, None
+        if tempdir is not None:
+            shutil.rmtree(tempdir, ignore_errors=True)
+
+    def _stop_server(self):
+        """Shut down the TerraMetric server, if one is running."""
+        server, self._server = self._server, None
+        if server is None:
+            return
+        try:
+            server.stdin.close()
+            server.wait(timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            server.kill()
+            server.wait()
+
+    def __del__(self):
+        self.close()
+
+    @staticmethod
+    def _read_responses(stream, responses: queue.Queue):
+        """Forward server output lines to the response queue; None marks EOF."""
+        for line in stream:
+            responses.put(line)
+        responses.put(None)
+
+    def _request_server(self, request: Dict[str, str]) -> Optional[Dict]:
+        """
+        Ask the running server to analyze a file ({"path": ...}) or, when the
+        build advertises --server-code, inline code ({"code": ...}).
+
+        Returns the raw TerraMetric report, or None if the server failed, in which
+        case it is shut down and later analyses fall back to one-shot runs.
+        """
+        try:
+            self._server.stdin.write(json.dumps(request) + "\n")
+            self._server.stdin.flush()
+            line = self._responses.get(timeout=TERRAMETRIC_TIMEOUT)
+            if line is not None:
+                report = json.loads(line)
+                # A reply with neither head nor data is an error, not a report
+                if isinstance(report, dict) and ("head" in report or "data" in report):
+                    return report
+                print(f"TerraMetric server returned no report: {line.strip()[:200]}")
+        except (OSError, queue.Empty, json.JSONDecodeError) as e:
+            print(f"Error talking to TerraMetric server: {e}")
+
+        # A timed-out, garbled or failed exchange leaves the protocol out of sync
+        self._stop_server()
+        return None
+
     def analyze_code(self, code: str, temp_file: str = "temp_analysis.tf") -> Dict[str, Any]:
         """
         Analyze a Terraform code block using TerraMetric
         Returns quality metrics
         """
+        # Hand the code inline, JSON-escaped onto one request line, to a server
+        # that advertises it; --stdin only says the one-shot CLI reads code
+        if self._server is not None and self._supports("--server-code"):
+            report = self._request_server({"code": code})
+            if report is not None:
+                return self._parse_metrics(report)
+
+        # Pipe the code straight through TerraMetric when it can read stdin; a
+        # running server without inline code takes it as a file below
+        if self._server is None and self._supports("--stdin"):
+            return self._analyze_code_stdin(code)
+
         # Write code to temporary file
-        temp_path = os.path.join(TERRAMETRIC_OUTPUT_DIR, temp_file)
+        temp_path = os.path.join(TERRAMETRIC_OUTPUT_DIR, f"{os.getpid()}_{temp_file}")
         with open(temp_path, "w", encoding="utf-8") as f:
             f.write(code)
 
-        # Output JSON path
-        output_json = os.path.join(TERRAMETRIC_OUTPUT_DIR, f"{temp_file}.json")
+        try:
+            report = self._analyze_path(temp_path)
+            return self._parse_metrics(report) if report is not None else self._empty_metrics()
+        finally:
+            # Clean up temp file
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def _analyze_path(self, path: str) -> Optional[Dict]:
+        """
+        Run TerraMetric on a .tf file, through the server when one is running.
+
+        Returns the raw TerraMetric report, or None if the analysis failed.
+        """
+        if self._server is not None:
+            report = self._request_server({"path": path})
+            if report is not None:
+                return report
+
+        # Output JSON path, unique per thread
+        output_json = os.path.join(
+            TERRAMETRIC_OUTPUT_DIR, f"{os.getpid()}_{threading.get_ident()}_report.json"
+        )
 
         try:
             # Run TerraMetric
@@ -203,66 +450,201 @@ class TerraMetricRunner:
                     self.terrametric_jar,
                     "-b",
                     "--file",
-                    temp_path,
+                    path,
                     "--target",
                     output_json,
                 ],
                 capture_output=True,
                 text=True,
-                timeout=30,
+                timeout=TERRAMETRIC_TIMEOUT,
                 check=False,
             )
 
             if result.returncode == 0 and os.path.exists(output_json):
                 with open(output_json, "r", encoding="utf-8") as f:
-                    metrics = json.load(f)
-                return self._parse_metrics(metrics)
+                    return json.load(f)
+            return None
+
+        except (subprocess.TimeoutExpired, OSError, json.JSONDecodeError) as e:
+            print(f"Error running TerraMetric: {e}")
+            return None
+        finally:
+            if os.path.exists(output_json):
+                os.remove(output_json)
+
+    def _analyze_code_stdin(self, code: str) -> Dict[str, Any]:
+        """
+        Analyze code passed on stdin, reading the JSON report from stdout.
+
+        Avoids writing, re-reading and deleting a temporary .tf file and a JSON
+        report for every block.
+        """
+        try:
+            result = subprocess.run(
+                [self.java_path, "-jar", self.terrametric_jar, "-b", "--stdin", "--stdout"],
+                input=code,
+                capture_output=True,
+                text=True,
+                timeout=TERRAMETRIC_TIMEOUT,
+                check=False,
+            )
+
+            if result.returncode == 0 and result.stdout.strip():
+                return self._parse_metrics(json.loads(result.stdout))
             return self._empty_metrics()
 
         except (subprocess.TimeoutExpired, OSError, json.JSONDecodeError) as e:
             print(f"Error running TerraMetric: {e}")
             return self._empty_metrics()
+
+    def analyze_code_batch(self, blocks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Analyze many code blocks with a single TerraMetric invocation.
+
+        Each block is written to its own file in the batch directory and TerraMetric
+        is run once over the whole directory, so the JVM start-up cost is paid once
+        per batch instead of once per block. Blocks missing from the aggregate report
+        are re-analyzed individually.
+
+        Returns one metrics dict per block, in input order.
+        """
+        if not blocks:
+            return []
+
+        # A running server already avoids per-block JVM start-up, and a lone block
+        # gains nothing from a batch directory (piped via stdin when supported);
+        # builds without --dir, or whose reports cannot be matched, analyze per block
+        if (
+            self._server is not None
+            or len(blocks) == 1
+            or not self._supports("--dir")
+            or not self._batch_reports_usable
+        ):
+            return [self.analyze_code(block["code"]) for block in blocks]
+
+        if self._tempdir is None:
+            self._tempdir = tempfile.mkdtemp(prefix="batch_", dir=TERRAMETRIC_OUTPUT_DIR)
+
+        file_names = [f"batch_{i}.tf" for i in range(len(blocks))]
+        for file_name, block in zip(file_names, blocks):
+            with open(os.path.join(self._tempdir, file_name), "w", encoding="utf-8") as f:
+                f.write(block["code"])
+
+        # Drop files left over from a previous, larger batch so they are not analyzed
+        current = set(file_names)
+        for entry in os.scandir(self._tempdir):
+            if entry.name.endswith(".tf") and entry.name not in current:
+                os.remove(entry.path)
+
+        output_json = f"{self._tempdir}_report.json"
+        reports = {}
+
+        try:
+            result = subprocess.run(
+                [
+                    self.java_path,
+                    "-jar",
+                    self.terrametric_jar,
+                    "-b",
+                    "--dir",
+                    self._tempdir,
+                    "--target",
+                    output_json,
+                ],
+                capture_output=True,
+                text=True,
+                timeout=TERRAMETRIC_TIMEOUT + len(blocks),
+                check=False,
+            )
+
+            if result.returncode == 0 and os.path.exists(output_json):
+                with open(output_json, "r", encoding="utf-8") as f:
+                    reports = self._index_batch_report(json.load(f))
+                if reports.keys().isdisjoint(file_names):
+                    print(
+                        "Warning: TerraMetric batch report matches none of the analyzed "
+                        "files; analyzing blocks one at a time from now on"
+                    )
+                    self._batch_reports_usable = False
+
+        except (subprocess.TimeoutExpired, OSError, json.JSONDecodeError) as e:
+            print(f"Error running TerraMetric batch: {e}")
         finally:
-            # Clean up temp files
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
             if os.path.exists(output_json):
                 os.remove(output_json)
 
+        results = [
+            self._parse_metrics(reports[file_name]) if file_name in reports else None
+            for file_name in file_names
+        ]
+
+        # Blocks missing from the report are re-analyzed one-shot; each waits on its
+        # own subprocess, so a few threads overlap those waits
+        missing = [i for i, metrics in enumerate(results) if metrics is None]
+        with concurrent.futures.ThreadPoolExecutor(max_workers=TERRAMETRIC_MAX_THREADS) as executor:
+            for i, metrics in zip(
+                missing,
+                executor.map(
+                    lambda i: self.analyze_code(blocks[i]["code"], f"retry_{i}.tf"), missing
+                ),
+            ):
+                results[i] = metrics
+        return results
+
+    @staticmethod
+    def _index_batch_report(raw_report: Any) -> Dict[str, Dict]:
+        """
+        Key a directory-level TerraMetric report by the base name of each analyzed file.
+
+        Accepts either a mapping of file path to per-file report or a list of per-file
+        reports carrying their path under a "file" key. Anything else, such as one
+        combined {"head", "data"} report, yields no per-file entries.
+        """
+        if isinstance(raw_report, dict):
+            items = raw_report.items()
+        elif isinstance(raw_report, list):
+            items = (
+                (report.get("file", ""), report)
+                for report in raw_report
+                if isinstance(report, dict)
+            )
+        else:
+            return {}
+        return {
+            os.path.basename(path): report
+            for path, report in items
+            if isinstance(path, str) and isinstance(report, dict)
+        }
+
     def _parse_metrics(self, raw_metrics: Dict) -> Dict[str, Any]:
         """Parse TerraMetric output into standardized format"""
         # TerraMetric returns {'head': {...}, 'data': [{block_metrics}, ...]}
-        head = raw_metrics.get("head", {})
         data = raw_metrics.get("data", [])
 
         # For single-block files, extract first block's detailed metrics
-        block_data = data[0] if data else {}
-
-        # Aggregate metrics from all blocks in the file
-        total_complexity = sum(block.get("sumMccabeCC", 0) for block in data)
-        max_depth = max((block.get("maxDepthNestedBlocks", 0) for block in data), default=0)
-        total_tokens = sum(block.get("numTokens", 0) for block in data)
-        total_dependencies = sum(
-            (
-                block.get("numImplicitDependentResources", 0)
-                + block.get("numExplicitResourceDependency", 0)
-            )
-            for block in data
-        )
+        return {**self._parse_file_head(raw_metrics), **self._parse_block(data[0] if data else {})}
 
-        # Extract additional detailed metrics from block
-        num_string_values = block_data.get("numStringValues", 0)
-        num_hard_coded_values = block_data.get("numLiteralExpression", 0)
-        num_loops = block_data.get("numLoops", 0)
-        num_conditions = block_data.get("numConditions", 0)
-        num_function_calls = block_data.get("numFunctionCall", 0)
-        num_deprecated = block_data.get("numDeprecatedFunctions", 0)
-        num_wildcards = block_data.get("numWildCardSuffixString", 0) + block_data.get(
-            "numStarString", 0
-        )
-        graph_depth = block_data.get("depthOfBlock", 0)
-        num_attrs = block_data.get("numAttrs", 0)
-        num_vars_in_block = block_data.get("numVars", 0)
+    def _parse_file_head(self, raw_metrics: Dict) -> Dict[str, Any]:
+        """
+        Parse the file-level part of a TerraMetric report: the values in its
+        head plus totals and maxima aggregated over every entry in its data.
+        """
+        head = raw_metrics.get("head", {})
+        data = raw_metrics.get("data", [])
+
+        # Aggregate metrics from all blocks in the file, in a single pass
+        total_complexity = 0
+        max_depth = 0
+        total_tokens = 0
+        total_dependencies = 0
+        for block in data:
+            get = block.get
+            total_complexity += get("sumMccabeCC", 0)
+            max_depth = max(max_depth, get("maxDepthNestedBlocks", 0))
+            total_tokens += get("numTokens", 0)
+            total_dependencies += get("numImplicitDependentResources", 0) + get(
+                "numExplicitResourceDependency", 0
+            )
 
         return {
             "tm_loc": head.get("num_lines_of_code", 0),
@@ -277,17 +659,22 @@ class TerraMetricRunner:
             "tm_num_data": head.get("num_data", 0),
             "tm_num_providers": head.get("num_providers", 0),
             "tm_num_tokens": total_tokens,
-            # Additional block-level metrics for MI calculation
-            "tm_num_string_values": num_string_values,
-            "tm_num_hard_coded": num_hard_coded_values,
-            "tm_num_loops": num_loops,
-            "tm_num_conditions": num_conditions,
-            "tm_num_function_calls": num_function_calls,
-            "tm_num_deprecated": num_deprecated,
-            "tm_num_wildcards": num_wildcards,
-            "tm_graph_depth": graph_depth,
-            "tm_num_attrs": num_attrs,
-            "tm_num_vars_in_block": num_vars_in_block,
+        }
+
+    def _parse_block(self, block_data: Dict) -> Dict[str, Any]:
+        """Parse the block-specific metrics of one TerraMetric data entry."""
+        return {
+            "tm_num_string_values": block_data.get("numStringValues", 0),
+            "tm_num_hard_coded": block_data.get("numLiteralExpression", 0),
+            "tm_num_loops": block_data.get("numLoops", 0),
+            "tm_num_conditions": block_data.get("numConditions", 0),
+            "tm_num_function_calls": block_data.get("numFunctionCall", 0),
+            "tm_num_deprecated": block_data.get("numDeprecatedFunctions", 0),
+            "tm_num_wildcards": block_data.get("numWildCardSuffixString", 0)
+            + block_data.get("numStarString", 0),
+            "tm_graph_depth": block_data.get("depthOfBlock", 0),
+            "tm_num_attrs": block_data.get("numAttrs", 0),
+            "tm_num_vars_in_block": block_data.get("numVars", 0),
         }
 
     def _empty_metrics(self) -> Dict[str, Any]:
@@ -321,69 +708,112 @@ class TerraMetricRunner:
 class GitHubAttributesFetcher:
     """Fetches GitHub repository attributes via API"""
 
-    def __init__(self, token: str):
+    def __init__(self, token: str, cache_file: str = GITHUB_CACHE_FILE):
+        """
+        Args:
+            token: GitHub API token
+            cache_file: JSON file persisting fetched attributes across runs
+        """
         self.token = token
         self.headers = {
             "Authorization": f"token {token}",
             "Accept": "application/vnd.github.v3+json",
         }
-        self.cache = {}  # Cache to avoid repeated API calls
+        self.cache = {}  # Attributes fetched or revalidated during this run
+
+        # Pooled keep-alive connections; Retry backs off on server errors, while rate
+        # limits are waited out in _request
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=32,
+            max_retries=Retry(
+                total=3,
+                backoff_factor=1,
+                status_forcelist=[500, 502, 503],
+                raise_on_status=False,
+            ),
+        )
+        self.session.mount("https://", adapter)
+        self.cache_file = cache_file
+        self._lock = threading.Lock()
+        self._next_request_at = 0.0  # Earliest time the next request may start (see _pace)
+
+        # Runs one of the two count requests of a repository alongside the other
+        self._count_executor = concurrent.futures.ThreadPoolExecutor(max_workers=GITHUB_MAX_WORKERS)
+        # Fetches whole repositories in the background (see prefetch)
+        self._fetch_executor = concurrent.futures.ThreadPoolExecutor(max_workers=GITHUB_MAX_WORKERS)
+
+        # Attributes from earlier runs: {repo: {"etag", "fetched_at", "attributes": {...}}}
+        self._stored = {}
+        if os.path.exists(cache_file):
+            try:
+                with open(cache_file, "rb") as f:
+                    self._stored = _loads_json(f.read())
+            except (OSError, ValueError) as e:
+                print(f"Ignoring unreadable GitHub cache {cache_file}: {e}")
+
+    def save_cache(self):
+        """Write the persistent attribute cache to disk."""
+        with self._lock:
+            with open(self.cache_file, "w", encoding="utf-8") as f:
+                json.dump(self._stored, f, indent=2, ensure_ascii=False)
+
+    def close(self):
+        """Shut down the background request threads and the HTTP session."""
+        self._count_executor.shutdown(wait=True)
+        self._fetch_executor.shutdown(wait=True)
+        self.session.close()
 
     def get_repo_attributes(self, repo_full_name: str) -> Dict[str, Any]:
-        """Fetch comprehensive GitHub repository attributes"""
+        """
+        Fetch comprehensive GitHub repository attributes.
+
+        Attributes cached by an earlier run are reused as they are for
+        GITHUB_CACHE_TTL seconds after they were fetched or last revalidated.
+        Older ones are revalidated with their ETag; a 304 reply reuses them
+        without fetching contributor and commit counts. Returns a copy, so
+        callers may modify the result freely.
+        """
 
         # Check cache first
         if repo_full_name in self.cache:
-            return self.cache[repo_full_name]
+            return dict(self.cache[repo_full_name])
 
         try:
-            # Get repository details
+            # Get repository details, conditionally if we have an earlier copy
             repo_url = f"{GITHUB_API_URL}/{repo_full_name}"
-            response = requests.get(repo_url, headers=self.headers, timeout=30)
-
-            if response.status_code == 403:
-                time.sleep(60)  # Rate limit wait
-                response = requests.get(repo_url, headers=self.headers, timeout=30)
+            stored = self._stored.get(repo_full_name)
+            if stored and time.time() - stored.get("fetched_at", 0) < GITHUB_CACHE_TTL:
+                self.cache[repo_full_name] = stored["attributes"]
+                return dict(stored["attributes"])
+
+            headers = {}
+            if stored and stored.get("etag"):
+                headers["If-None-Match"] = stored["etag"]
+            response = self._request("GET", repo_url, headers=headers)
+
+            if response.status_code == 304:
+                # Unchanged since the last run; does not count against the rate limit
+                self.cache[repo_full_name] = stored["attributes"]
+                with self._lock:
+                    stored["fetched_at"] = time.time()
+                return dict(stored["attributes"])
 
             response.raise_for_status()
-            repo_data = response.json()
-
-            # Get contributors count
-            contributors_url = f"{GITHUB_API_URL}/{repo_full_name}/contributors"
-            contributors_response = requests.get(
-                contributors_url,
-                headers=self.headers,
-                params={"per_page": 1, "anon": "true"},
-                timeout=30,
-            )
+            repo_data = _loads_json(response.content)
 
-            contributors_count = 0
-            if contributors_response.status_code == 200:
-                # Get count from Link header
-                link_header = contributors_response.headers.get("Link", "")
-                if "last" in link_header:
-                    # Parse last page number
-                    match = re.search(r'page=(\d+)>; rel="last"', link_header)
-                    if match:
-                        contributors_count = int(match.group(1))
-                else:
-                    contributors_count = len(contributors_response.json())
-
-            # Get commit count
-            commits_url = f"{GITHUB_API_URL}/{repo_full_name}/commits"
-            commits_response = requests.get(
-                commits_url, headers=self.headers, params={"per_page": 1}, timeout=30
+            # Get contributors and commit counts, both requests in flight at once
+            contributors_future = self._count_executor.submit(
+                self._count_items,
+                f"{GITHUB_API_URL}/{repo_full_name}/contributors",
+                {"per_page": 1, "anon": "true"},
             )
-
-            commit_count = 0
-            if commits_response.status_code == 200:
-                link_header = commits_response.headers.get("Link", "")
-                if "last" in link_header:
-                    match = re.search(r'page=(\d+)>; rel="last"', link_header)
-                    if match:
-                        commit_count = int(match.group(1))
-                else:
-                    commit_count = len(commits_response.json()) if commits_response.json() else 0
+            commit_count = self._count_items(
+                f"{GITHUB_API_URL}/{repo_full_name}/commits", {"per_page": 1}
+            )
+            contributors_count = contributors_future.result()
 
             attributes = {
                 "gh_stars": repo_data.get("stargazers_count", 0),
@@ -414,16 +844,112 @@ class GitHubAttributesFetcher:
 
             # Cache the result
             self.cache[repo_full_name] = attributes
+            with self._lock:
+                self._stored[repo_full_name] = {
+                    "etag": response.headers.get("ETag", ""),
+                    "fetched_at": time.time(),
+                    "attributes": attributes,
+                }
 
-            # Rate limit handling
-            time.sleep(0.5)
-
-            return attributes
+            return dict(attributes)
 
         except (requests.RequestException, KeyError, ValueError) as e:
             print(f"Error fetching GitHub attributes for {repo_full_name}: {e}")
             return self._empty_attributes()
 
+    def _count_items(self, url: str, params: Dict[str, Any]) -> int:
+        """
+        Count the items of a paginated endpoint requested with per_page=1.
+
+        A HEAD request returns the Link header without a body, and the last page
+        number is the item count. Without a Link header all items fit on one page,
+        which takes a GET to count.
+        """
+        response = self._request("HEAD", url, params=params, allow_redirects=True)
+        if response.status_code != 200:
+            return 0
+
+        # Get count from Link header
+        link_header = response.headers.get("Link", "")
+        if "last" in link_header:
+            # Parse last page number
+            match = LAST_PAGE_PATTERN.search(link_header)
+            return int(match.group(1)) if match else 0
+
+        response = self._request("GET", url, params=params)
+        if response.status_code != 200:
+            return 0
+        return len(_loads_json(response.content) or [])
+
+    def _request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Send a request on the pooled session, then pace against the rate limit.
+
+        A 403 or 429 that carries Retry-After (secondary limit) or reports an
+        exhausted budget (primary limit) is retried once the limit has passed:
+        after Retry-After seconds, or at X-RateLimit-Reset via _pace. Any other
+        403, such as a missing permission, is returned as it is.
+        """
+        for _ in range(GITHUB_RATE_LIMIT_RETRIES + 1):
+            response = self.session.request(method, url, timeout=30, **kwargs)
+            headers = response.headers
+            rate_limited = response.status_code in (403, 429) and (
+                "Retry-After" in headers or headers.get("X-RateLimit-Remaining") == "0"
+            )
+            if rate_limited and "Retry-After" in headers:
+                try:
+                    time.sleep(int(headers["Retry-After"]))
+                except ValueError:
+                    time.sleep(60)
+            self._pace(response)
+            if not rate_limited:
+                break
+        return response
+
+    def _pace(self, response: requests.Response):
+        """
+        Spread the remaining rate-limit budget evenly until it resets, once it runs low.
+
+        Requests run unpaced (bounded only by the thread pools) while at least
+        GITHUB_RATE_LIMIT_RESERVE remain, and 304 replies cost no budget at all.
+        Below the reserve, the next request slot is reserved on a schedule shared
+        by all threads, spaced so the budget lasts until X-RateLimit-Reset; with
+        none left the caller waits for the reset.
+        """
+        if response.status_code == 304:
+            return
+        try:
+            remaining = int(response.headers["X-RateLimit-Remaining"])
+            reset = int(response.headers["X-RateLimit-Reset"])
+        except (KeyError, ValueError):
+            return
+
+        if remaining >= GITHUB_RATE_LIMIT_RESERVE:
+            return
+
+        now = time.time()
+        if remaining > 0:
+            earliest, interval = now, max(0.0, reset - now) / remaining
+        else:
+            earliest, interval = reset, 0.0  # The next response reports the fresh budget
+        with self._lock:
+            start = max(self._next_request_at, earliest)
+            self._next_request_at = start + interval
+        time.sleep(max(0.0, start - now))
+
+    def prefetch(self, repo_full_names: Iterable[str]) -> Dict[str, concurrent.futures.Future]:
+        """
+        Start fetching attributes for many repositories in the background.
+
+        Returns a mapping of repository name to a future of its attributes, so the
+        network latency overlaps with whatever the caller does meanwhile. Call
+        save_cache once the futures are done.
+        """
+        return {
+            name: self._fetch_executor.submit(self.get_repo_attributes, name)
+            for name in repo_full_names
+        }
+
     def _empty_attributes(self) -> Dict[str, Any]:
         """Return empty attributes if fetch fails"""
         return {
@@ -448,6 +974,252 @@ class GitHubAttributesFetcher:
         }
 
 
+# TerraMetric fields that feed the Maintainability Index
+MI_METRIC_KEYS = (
+    "tm_num_variables",
+    "tm_num_outputs",
+    "tm_num_resources",
+    "tm_num_modules",
+    "tm_num_data",
+    "tm_num_blocks",
+    "tm_complexity",
+    "tm_nesting_depth",
+    "tm_graph_depth",
+    "tm_num_attrs",
+    "tm_num_hard_coded",
+    "tm_num_dependencies",
+    "tm_num_loops",
+    "tm_num_conditions",
+    "tm_num_deprecated",
+    "tm_num_wildcards",
+)
+_mi_metric_values = operator.itemgetter(*MI_METRIC_KEYS)
+
+
+@functools.lru_cache(maxsize=65536)
+def _composition_score(
+    num_resources: int, num_modules: int, block_loc: int, num_variables: int, num_blocks: int
+) -> float:
+    """
+    Resource Composition (25%): Evaluates how well resources are organized.
+
+    - Module usage ratio: Prefer module composition over direct resources
+    - Resource block size: Smaller, focused blocks are better
+    - Variable parameterization: Appropriate use of variables
+    """
+    # 1. Module composition ratio (40% of category)
+    # Modules promote reusability
+    total_infra = num_resources + num_modules
+    if total_infra > 0:
+        module_ratio = num_modules / total_infra
+        # Optimal: 20-60% modules (balanced range)
+        if 0.2 <= module_ratio <= 0.6:
+            module_score = 90
+        elif module_ratio < 0.2:
+            # Gradual penalty for low modularity
+            module_score = max(40, 90 * ((module_ratio / 0.2) ** 1.2))
+        else:
+            # Gradual penalty for over-modularization
+            module_score = max(30, 90 - ((module_ratio - 0.6) * 150))
+    else:
+        module_score = 60  # Neutral for non-infra blocks
+
+    # 2. Block size appropriateness (35% of category)
+    # Concise blocks are better (10-60 LOC)
+    if block_loc == 0:
+        size_score = 70
+    elif 10 <= block_loc <= 60:
+        # Peak at 25 LOC
+        if block_loc <= 25:
+            size_score = 70 + ((block_loc - 10) / 15) * 25  # 70-95
+        else:
+            size_score = 95 - ((block_loc - 25) / 35) * 15  # 95-80
+    elif block_loc < 10:
+        size_score = 50 + (block_loc / 10) * 20
+    else:
+        # Penalty for large blocks
+        size_score = max(20, 80 - ((block_loc - 60) ** 1.1) / 5)
+
+    # 3. Variable usage (25% of category)
+    # Good parameterization
+    var_ratio = num_variables / max(num_blocks, 1)
+    if 0.4 <= var_ratio <= 1.5:  # Reasonable range
+        var_score = 90
+    elif var_ratio < 0.4:
+        var_score = max(50, 90 * ((var_ratio / 0.4) ** 1.1))
+    else:
+        var_score = max(40, 90 - ((var_ratio - 1.5) * 20))
+
+    return module_score * 0.40 + size_score * 0.35 + var_score * 0.25
+
+
+@functools.lru_cache(maxsize=65536)
+def _clarity_score(num_attrs: int, num_hard_coded: int, nesting_depth: int) -> float:
+    """
+    Configuration Clarity (25%): Readability and explicitness of the code.
+
+    - Hard-coded values: Penalize magic numbers/strings
+    - Attribute density: Reasonable configuration complexity
+    - Nesting depth: Avoid deep nesting
+    """
+    # 1. Explicitness (40% of category)
+    # Prefer variables/locals over hard-coded values
+    if num_attrs > 0:
+        hard_coded_ratio = num_hard_coded / num_attrs
+        # Allow up to 25% hard-coding (some is acceptable for names/tags)
+        if hard_coded_ratio <= 0.25:
+            explicit_score = 90
+        else:
+            # Gradual penalty for excessive hard-coding
+            explicit_score = max(30, 90 * ((0.25 / hard_coded_ratio) ** 1.2))
+    else:
+        explicit_score = 90
+
+    # 2. Configuration complexity (35% of category)
+    # Reasonable attribute count
+    if num_attrs <= 12:
+        attr_score = 90
+    elif num_attrs <= 25:
+        # Gradual penalty 12-25 attrs
+        attr_score = 90 - ((num_attrs - 12) * 3)
+    else:
+        # Steeper penalty beyond 25
+        attr_score = max(20, 51 - (((num_attrs - 25) ** 1.2) / 3))
+
+    # 3. Structural clarity (25% of category)
+    # Prefer flat structure but allow some nesting
+    if nesting_depth <= 1:
+        nesting_score = 90
+    elif nesting_depth <= 2:
+        nesting_score = 70  # Acceptable level of nesting
+    elif nesting_depth <= 3:
+        nesting_score = 45  # Penalty at nesting=3
+    else:
+        # Heavy penalty for deep nesting
+        nesting_score = max(15, 45 - ((nesting_depth - 3) * 12))
+
+    return explicit_score * 0.40 + attr_score * 0.35 + nesting_score * 0.25
+
+
+@functools.lru_cache(maxsize=65536)
+def _dependency_score(complexity: int, num_dependencies: int, graph_depth: int) -> float:
+    """
+    Dependency Management (20%): Complexity of resource relationships.
+
+    - Cyclomatic complexity: Control flow complexity
+    - Dependency count: Number of resource dependencies
+    - Graph depth: Depth of dependency chains
+    """
+    # 1. Cyclomatic complexity (35% of category)
+    # Declarative IaC should have low control flow complexity
+    if complexity <= 4:
+        complexity_score = 90
+    elif complexity <= 8:
+        # Gradual penalty 4-8
+        complexity_score = 90 - ((complexity - 4) * 8)
+    else:
+        # Steeper penalty beyond 8
+        complexity_score = max(20, 58 - (((complexity - 8) ** 1.2) / 2))
+
+    # 2. Dependency coupling (35% of category)
+    # Moderate coupling is acceptable
+    deps = num_dependencies
+    if deps <= 3:
+        dep_score = 90
+    elif deps <= 6:
+        # Gradual penalty 3-6
+        dep_score = 90 - ((deps - 3) * 10)
+    else:
+        # Steeper penalty for tight coupling
+        dep_score = max(20, 60 - (((deps - 6) ** 1.2) / 2))
+
+    # 3. Dependency depth (30% of category)
+    # Shallow dependency chains preferred
+    if graph_depth <= 1:
+        depth_score = 90
+    elif graph_depth <= 3:
+        depth_score = 90 - ((graph_depth - 1) * 15)  # 90, 75, 60
+    else:
+        # Penalty for deep chains
+        depth_score = max(20, 60 - ((graph_depth - 3) * 10))
+
+    return complexity_score * 0.35 + dep_score * 0.35 + depth_score * 0.30
+
+
+@functools.lru_cache(maxsize=65536)
+def _security_score(
+    num_deprecated: int, num_wildcards: int, num_loops: int, num_conditions: int
+) -> float:
+    """
+    Security & Best Practices (20%): Safe coding patterns.
+
+    - No deprecated functions
+    - No wildcard usage in security contexts
+    - Controlled use of dynamic blocks/loops
+    """
+    # 1. No deprecated usage (40% of category)
+    # Deprecated functions are security risks
+    deprecated_score = max(20, 90 - (num_deprecated * 35))
+
+    # 2. No wildcard/star usage (30% of category)
+    # Wildcards in security contexts are risky
+    wildcard_score = max(20, 90 - (num_wildcards * 30))
+
+    # 3. Controlled dynamism (30% of category)
+    # Some dynamism is acceptable for flexibility
+    dynamic_count = num_loops + num_conditions
+    if dynamic_count == 0:
+        dynamic_score = 90
+    elif dynamic_count <= 2:
+        dynamic_score = 80  # Acceptable level
+    elif dynamic_count <= 4:
+        dynamic_score = 80 - ((dynamic_count - 2) * 15)  # 80, 65, 50
+    else:
+        # Penalty for excessive dynamic behavior
+        dynamic_score = max(20, 50 - ((dynamic_count - 4) * 10))
+
+    return deprecated_score * 0.40 + wildcard_score * 0.30 + dynamic_score * 0.30
+
+
+@functools.lru_cache(maxsize=65536)
+def _operational_score(num_resources: int, num_outputs: int, num_data: int) -> float:
+    """
+    Operational Readiness (10%): Ease of operations and changes.
+
+    - Output definitions: Proper outputs for observability
+    - Data source usage: Appropriate external data usage
+    """
+    # 1. Output completeness (50% of category)
+    # Resources should expose useful outputs
+    if num_resources > 0:
+        output_ratio = num_outputs / num_resources
+        # Reasonable output ratio: 25-75%
+        if 0.25 <= output_ratio <= 0.75:
+            output_score = 90
+        elif output_ratio < 0.25:
+            # Gradual penalty for insufficient outputs
+            output_score = max(30, 90 * ((output_ratio / 0.25) ** 1.2))
+        else:
+            # Gradual penalty for excessive outputs
+            output_score = max(40, 90 - ((output_ratio - 0.75) * 60))
+    else:
+        output_score = 70  # Neutral for non-resource blocks
+
+    # 2. Data source usage (50% of category)
+    # Moderate use of data sources is fine
+    data_ratio = num_data / max(num_resources + num_data, 1)
+    if data_ratio <= 0.25:
+        data_score = 90
+    elif data_ratio <= 0.4:
+        # Gradual penalty 25-40%
+        data_score = 90 - ((data_ratio - 0.25) * 100)
+    else:
+        # Steeper penalty for data-heavy configs
+        data_score = max(30, 75 - (((data_ratio - 0.4) ** 1.2) * 80))
+
+    return output_score * 0.50 + data_score * 0.50
+
+
 class MaintainabilityIndexCalculator:
     """
     Calculates Maintainability Index for Terraform/HCL code blocks.
@@ -479,17 +1251,33 @@ class MaintainabilityIndexCalculator:
         Returns:
             Maintainability score (0-100), higher is better
         """
-        calc = MaintainabilityIndexCalculator
-
-        # Extract metrics with safe defaults
-        metrics = calc._extract_metrics(tm_metrics, block)
-
-        # Calculate category scores
-        composition_score = calc._calculate_composition_score(metrics)
-        clarity_score = calc._calculate_clarity_score(metrics)
-        dependency_score = calc._calculate_dependency_score(metrics)
-        security_score = calc._calculate_security_score(metrics)
-        operational_score = calc._calculate_operational_score(metrics)
+        get = tm_metrics.get
+        num_resources = get("tm_num_resources", 0)
+
+        # Calculate category scores straight from the metric values; the
+        # scoring functions are memoized on these scalars
+        composition_score = _composition_score(
+            num_resources,
+            get("tm_num_modules", 0),
+            block.get("loc", 0),
+            get("tm_num_variables", 0),
+            get("tm_num_blocks", 0),
+        )
+        clarity_score = _clarity_score(
+            get("tm_num_attrs", 0), get("tm_num_hard_coded", 0), get("tm_nesting_depth", 0)
+        )
+        dependency_score = _dependency_score(
+            get("tm_complexity", 0), get("tm_num_dependencies", 0), get("tm_graph_depth", 0)
+        )
+        security_score = _security_score(
+            get("tm_num_deprecated", 0),
+            get("tm_num_wildcards", 0),
+            get("tm_num_loops", 0),
+            get("tm_num_conditions", 0),
+        )
+        operational_score = _operational_score(
+            num_resources, get("tm_num_outputs", 0), get("tm_num_data", 0)
+        )
 
         # Weighted final score
         mi = (
@@ -503,257 +1291,157 @@ class MaintainabilityIndexCalculator:
         return round(mi, 2)
 
     @staticmethod
-    def _extract_metrics(tm_metrics: Dict[str, Any], block: Dict[str, Any]) -> Dict[str, Any]:
-        """Extract and normalize all metrics needed for MI calculation."""
-        return {
-            # File-level metrics
-            "loc": tm_metrics.get("tm_loc", 0),
-            "num_variables": tm_metrics.get("tm_num_variables", 0),
-            "num_outputs": tm_metrics.get("tm_num_outputs", 0),
-            "num_resources": tm_metrics.get("tm_num_resources", 0),
-            "num_modules": tm_metrics.get("tm_num_modules", 0),
-            "num_data": tm_metrics.get("tm_num_data", 0),
-            "num_providers": tm_metrics.get("tm_num_providers", 0),
-            "num_blocks": tm_metrics.get("tm_num_blocks", 0),
-            # Block-level metrics
-            "block_loc": block.get("loc", 0),
-            "block_type": block.get("block_type", ""),
-            "complexity": tm_metrics.get("tm_complexity", 0),
-            "nesting_depth": tm_metrics.get("tm_nesting_depth", 0),
-            "graph_depth": tm_metrics.get("tm_graph_depth", 0),
-            # Quality metrics
-            "num_attrs": tm_metrics.get("tm_num_attrs", 0),
-            "num_hard_coded": tm_metrics.get("tm_num_hard_coded", 0),
-            "num_vars_in_block": tm_metrics.get("tm_num_vars_in_block", 0),
-            "num_dependencies": tm_metrics.get("tm_num_dependencies", 0),
-            # Control flow
-            "num_loops": tm_metrics.get("tm_num_loops", 0),
-            "num_conditions": tm_metrics.get("tm_num_conditions", 0),
-            "num_function_calls": tm_metrics.get("tm_num_function_calls", 0),
-            # Anti-patterns
-            "num_deprecated": tm_metrics.get("tm_num_deprecated", 0),
-            "num_wildcards": tm_metrics.get("tm_num_wildcards", 0),
-        }
-
-    @staticmethod
-    def _calculate_composition_score(m: Dict[str, Any]) -> float:
+    def calculate_mi_batch(
+        all_tm_metrics: List[Dict[str, Any]], blocks: List[Dict[str, Any]]
+    ) -> List[float]:
         """
-        Resource Composition (25%): Evaluates how well resources are organized.
+        Calculate the Maintainability Index for many blocks at once.
 
-        - Module usage ratio: Prefer module composition over direct resources
-        - Resource block size: Smaller, focused blocks are better
-        - Variable parameterization: Appropriate use of variables
+        Equivalent to calling calculate_mi per block, but blocks with identical
+        metrics and size are scored only once. Metrics must be complete
+        TerraMetricRunner dicts, so the key is read with one itemgetter call.
         """
-        # 1. Module composition ratio (40% of category)
-        # Modules promote reusability
-        total_infra = m["num_resources"] + m["num_modules"]
-        if total_infra > 0:
-            module_ratio = m["num_modules"] / total_infra
-            # Optimal: 20-60% modules (balanced range)
-            if 0.2 <= module_ratio <= 0.6:
-                module_score = 90
-            elif module_ratio < 0.2:
-                # Gradual penalty for low modularity
-                module_score = max(40, 90 * ((module_ratio / 0.2) ** 1.2))
-            else:
-                # Gradual penalty for over-modularization
-                module_score = max(30, 90 - ((module_ratio - 0.6) * 150))
-        else:
-            module_score = 60  # Neutral for non-infra blocks
-
-        # 2. Block size appropriateness (35% of category)
-        # Concise blocks are better (10-60 LOC)
-        block_loc = m["block_loc"]
-        if block_loc == 0:
-            size_score = 70
-        elif 10 <= block_loc <= 60:
-            # Peak at 25 LOC
-            if block_loc <= 25:
-                size_score = 70 + ((block_loc - 10) / 15) * 25  # 70-95
-            else:
-                size_score = 95 - ((block_loc - 25) / 35) * 15  # 95-80
-        elif block_loc < 10:
-            size_score = 50 + (block_loc / 10) * 20
-        else:
-            # Penalty for large blocks
-            size_score = max(20, 80 - ((block_loc - 60) ** 1.1) / 5)
-
-        # 3. Variable usage (25% of category)
-        # Good parameterization
-        var_ratio = m["num_variables"] / max(m["num_blocks"], 1)
-        if 0.4 <= var_ratio <= 1.5:  # Reasonable range
-            var_score = 90
-        elif var_ratio < 0.4:
-            var_score = max(50, 90 * ((var_ratio / 0.4) ** 1.1))
-        else:
-            var_score = max(40, 90 - ((var_ratio - 1.5) * 20))
-
-        return module_score * 0.40 + size_score * 0.35 + var_score * 0.25
+        calc = MaintainabilityIndexCalculator
+        scored = {}
+        scores = []
+        for tm_metrics, block in zip(all_tm_metrics, blocks):
+            key = (block["loc"], _mi_metric_values(tm_metrics))
+            mi = scored.get(key)
+            if mi is None:
+                mi = scored[key] = calc.calculate_mi(tm_metrics, block)
+            scores.append(mi)
+        return scores
+
+
+def _analyze_blocks(
+    runner: TerraMetricRunner, use_terrametric: bool, blocks: List[Dict[str, Any]]
+) -> List[Dict[str, Any]]:
+    """
+    Analyze code blocks with TerraMetric, returning metrics in block order.
 
-    @staticmethod
-    def _calculate_clarity_score(m: Dict[str, Any]) -> float:
-        """
-        Configuration Clarity (25%): Readability and explicitness of the code.
+    Every block is analyzed on its own, whether or not a server is running, so
+    all rows of a dataset carry metrics of the same meaning.
+    """
+    if not use_terrametric:
+        return [runner._empty_metrics()] * len(blocks)  # One shared, read-only dict
+    return runner.analyze_code_batch(blocks)
 
-        - Hard-coded values: Penalize magic numbers/strings
-        - Attribute density: Reasonable configuration complexity
-        - Nesting depth: Avoid deep nesting
-        """
-        # 1. Explicitness (40% of category)
-        # Prefer variables/locals over hard-coded values
-        if m["num_attrs"] > 0:
-            hard_coded_ratio = m["num_hard_coded"] / m["num_attrs"]
-            # Allow up to 25% hard-coding (some is acceptable for names/tags)
-            if hard_coded_ratio <= 0.25:
-                explicit_score = 90
-            else:
-                # Gradual penalty for excessive hard-coding
-                explicit_score = max(30, 90 * ((0.25 / hard_coded_ratio) ** 1.2))
-        else:
-            explicit_score = 90
 
-        # 2. Configuration complexity (35% of category)
-        # Reasonable attribute count
-        num_attrs = m["num_attrs"]
-        if num_attrs <= 12:
-            attr_score = 90
-        elif num_attrs <= 25:
-            # Gradual penalty 12-25 attrs
-            attr_score = 90 - ((num_attrs - 12) * 3)
-        else:
-            # Steeper penalty beyond 25
-            attr_score = max(20, 51 - (((num_attrs - 25) ** 1.2) / 3))
-
-        # 3. Structural clarity (25% of category)
-        # Prefer flat structure but allow some nesting
-        nesting = m["nesting_depth"]
-        if nesting <= 1:
-            nesting_score = 90
-        elif nesting <= 2:
-            nesting_score = 70  # Acceptable level of nesting
-        elif nesting <= 3:
-            nesting_score = 45  # Penalty at nesting=3
-        else:
-            # Heavy penalty for deep nesting
-            nesting_score = max(15, 45 - ((nesting - 3) * 12))
+def _analyze_repository(
+    repo_path: str,
+    runner: TerraMetricRunner,
+    use_terrametric: bool,
+    parse_workers: Optional[int] = None,
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], List[float]]:
+    """
+    Extract, analyze and score the code blocks of a local repository.
 
-        return explicit_score * 0.40 + attr_score * 0.35 + nesting_score * 0.25
+    Returns (blocks, tm_metrics, mi), with one metrics dict and score per block.
+    """
+    blocks = TerraformCodeExtractor(repo_path, max_workers=parse_workers).extract_blocks()
 
-    @staticmethod
-    def _calculate_dependency_score(m: Dict[str, Any]) -> float:
-        """
-        Dependency Management (20%): Complexity of resource relationships.
+    # Analyze the blocks with TerraMetric, then score them together
+    all_tm_metrics = _analyze_blocks(runner, use_terrametric, blocks)
+    all_mi = MaintainabilityIndexCalculator.calculate_mi_batch(all_tm_metrics, blocks)
+    return blocks, all_tm_metrics, all_mi
 
-        - Cyclomatic complexity: Control flow complexity
-        - Dependency count: Number of resource dependencies
-        - Graph depth: Depth of dependency chains
-        """
-        # 1. Cyclomatic complexity (35% of category)
-        # Declarative IaC should have low control flow complexity
-        complexity = m["complexity"]
-        if complexity <= 4:
-            complexity_score = 90
-        elif complexity <= 8:
-            # Gradual penalty 4-8
-            complexity_score = 90 - ((complexity - 4) * 8)
-        else:
-            # Steeper penalty beyond 8
-            complexity_score = max(20, 58 - (((complexity - 8) ** 1.2) / 2))
-
-        # 2. Dependency coupling (35% of category)
-        # Moderate coupling is acceptable
-        deps = m["num_dependencies"]
-        if deps <= 3:
-            dep_score = 90
-        elif deps <= 6:
-            # Gradual penalty 3-6
-            dep_score = 90 - ((deps - 3) * 10)
-        else:
-            # Steeper penalty for tight coupling
-            dep_score = max(20, 60 - (((deps - 6) ** 1.2) / 2))
-
-        # 3. Dependency depth (30% of category)
-        # Shallow dependency chains preferred
-        graph_depth = m["graph_depth"]
-        if graph_depth <= 1:
-            depth_score = 90
-        elif graph_depth <= 3:
-            depth_score = 90 - ((graph_depth - 1) * 15)  # 90, 75, 60
-        else:
-            # Penalty for deep chains
-            depth_score = max(20, 60 - ((graph_depth - 3) * 10))
 
-        return complexity_score * 0.35 + dep_score * 0.35 + depth_score * 0.30
+def _clone_repository(repo_full_name: str, repo_path: str, idx: int, total: int) -> bool:
+    """Clone a GitHub repository into repo_path. Returns True on success."""
+    print(f"\n[{idx}/{total}] [CLONE] {repo_full_name} - not found locally, cloning...")
+    # Create corpus directory if it doesn't exist
+    os.makedirs(CLONE_DIRECTORY, exist_ok=True)
 
-    @staticmethod
-    def _calculate_security_score(m: Dict[str, Any]) -> float:
-        """
-        Security & Best Practices (20%): Safe coding patterns.
+    # Clone the repository
+    clone_url = f"https://github.com/{repo_full_name}.git"
+    clone_cmd = ["git", "clone", clone_url, repo_path]
 
-        - No deprecated functions
-        - No wildcard usage in security contexts
-        - Controlled use of dynamic blocks/loops
-        """
-        # 1. No deprecated usage (40% of category)
-        # Deprecated functions are security risks
-        deprecated_score = max(20, 90 - (m["num_deprecated"] * 35))
-
-        # 2. No wildcard/star usage (30% of category)
-        # Wildcards in security contexts are risky
-        wildcard_score = max(20, 90 - (m["num_wildcards"] * 30))
-
-        # 3. Controlled dynamism (30% of category)
-        # Some dynamism is acceptable for flexibility
-        dynamic_count = m["num_loops"] + m["num_conditions"]
-        if dynamic_count == 0:
-            dynamic_score = 90
-        elif dynamic_count <= 2:
-            dynamic_score = 80  # Acceptable level
-        elif dynamic_count <= 4:
-            dynamic_score = 80 - ((dynamic_count - 2) * 15)  # 80, 65, 50
-        else:
-            # Penalty for excessive dynamic behavior
-            dynamic_score = max(20, 50 - ((dynamic_count - 4) * 10))
+    try:
+        subprocess.run(
+            clone_cmd, check=True, capture_output=True, text=True, timeout=300  # 5 minute timeout
+        )
+        print(f"  ✓ Successfully cloned {repo_full_name}")
+        return True
+    except subprocess.TimeoutExpired:
+        print(f"  ✗ Clone timeout for {repo_full_name} (>5 minutes)")
+    except subprocess.CalledProcessError as e:
+        print(f"  ✗ Clone failed for {repo_full_name}: {e.stderr.strip()}")
+    except Exception as e:
+        print(f"  ✗ Unexpected error cloning {repo_full_name}: {e}")
+    return False
+
+
+def _cloned_repository_dirs() -> Set[str]:
+    """Names of the directories in CLONE_DIRECTORY, listed with a single scandir."""
+    try:
+        with os.scandir(CLONE_DIRECTORY) as entries:
+            return {entry.name for entry in entries if entry.is_dir()}
+    except FileNotFoundError:
+        return set()
+
+
+def _clone_and_analyze(
+    repo_full_name: str,
+    idx: int,
+    total: int,
+    cloned: bool,
+    runner: TerraMetricRunner,
+    use_terrametric: bool,
+    parse_workers: Optional[int] = None,
+):
+    """
+    Analyze a repository of the corpus, cloning it first if it is not there yet.
 
-        return deprecated_score * 0.40 + wildcard_score * 0.30 + dynamic_score * 0.30
+    cloned tells whether the repository's directory already exists (see
+    _cloned_repository_dirs), so no stat is needed per repository. Returns the
+    _analyze_repository result, or None if the clone failed.
+    """
+    repo_path = os.path.join(CLONE_DIRECTORY, repo_full_name.replace("/", "_"))
+
+    if not cloned and not _clone_repository(repo_full_name, repo_path, idx, total):
+        return None
+    return _analyze_repository(repo_path, runner, use_terrametric, parse_workers)
+
+
+# TerraMetric runner of a repository worker process (see _init_repository_worker)
+_worker_runner = None
+_worker_use_terrametric = False
+
+
+def _init_repository_worker(use_terrametric: bool):
+    """Give a repository worker process its own TerraMetric runner and server."""
+    global _worker_runner, _worker_use_terrametric
+    _worker_runner = TerraMetricRunner()
+    # Pool workers leave through os._exit, which skips atexit; Finalize still runs
+    multiprocessing.util.Finalize(None, _worker_runner.close, exitpriority=10)
+    _worker_use_terrametric = use_terrametric and _worker_runner.check_installation()
+    if _worker_use_terrametric:
+        _worker_runner.start_server()
+
+
+def _analyze_repository_in_worker(repo_full_name: str, idx: int, total: int, cloned: bool):
+    """_clone_and_analyze with the worker's runner; files are parsed in-process."""
+    return _clone_and_analyze(
+        repo_full_name,
+        idx,
+        total,
+        cloned,
+        _worker_runner,
+        _worker_use_terrametric,
+        parse_workers=1,
+    )
 
-    @staticmethod
-    def _calculate_operational_score(m: Dict[str, Any]) -> float:
-        """
-        Operational Readiness (10%): Ease of operations and changes.
 
-        - Output definitions: Proper outputs for observability
-        - Data source usage: Appropriate external data usage
-        """
-        # 1. Output completeness (50% of category)
-        # Resources should expose useful outputs
-        if m["num_resources"] > 0:
-            output_ratio = m["num_outputs"] / m["num_resources"]
-            # Reasonable output ratio: 25-75%
-            if 0.25 <= output_ratio <= 0.75:
-                output_score = 90
-            elif output_ratio < 0.25:
-                # Gradual penalty for insufficient outputs
-                output_score = max(30, 90 * ((output_ratio / 0.25) ** 1.2))
-            else:
-                # Gradual penalty for excessive outputs
-                output_score = max(40, 90 - ((output_ratio - 0.75) * 60))
-        else:
-            output_score = 70  # Neutral for non-resource blocks
-
-        # 2. Data source usage (50% of category)
-        # Moderate use of data sources is fine
-        data_ratio = m["num_data"] / max(m["num_resources"] + m["num_data"], 1)
-        if data_ratio <= 0.25:
-            data_score = 90
-        elif data_ratio <= 0.4:
-            # Gradual penalty 25-40%
-            data_score = 90 - ((data_ratio - 0.25) * 100)
-        else:
-            # Steeper penalty for data-heavy configs
-            data_score = max(30, 75 - (((data_ratio - 0.4) ** 1.2) * 80))
+class CodeRecord(NamedTuple):
+    """A code block kept for the _code.json file; a tuple is far smaller than a dict."""
 
-        return output_score * 0.50 + data_score * 0.50
+    code: str
+    repository: str
+    file_path: str
+    block_type: str
+    block_name: str
+    start_line: int
+    end_line: int
 
 
 class DatasetBuilder:
@@ -821,6 +1509,11 @@ class DatasetBuilder:
         "gh_default_branch",
     ]
 
+    # Metric and attribute columns in CSV order; rows are written as tuples
+    TM_FIELDS = tuple(header for header in CSV_HEADERS if header.startswith("tm_"))
+    GH_FIELDS = tuple(header for header in CSV_HEADERS if header.startswith("gh_"))
+    _tm_values = operator.itemgetter(*TM_FIELDS)
+
     def __init__(self, github_token: str = None, skip_github: bool = False):
         """
         Initialize the dataset builder.
@@ -831,11 +1524,18 @@ class DatasetBuilder:
         """
         self.terrametric_runner = TerraMetricRunner()
         self.github_fetcher = GitHubAttributesFetcher(github_token) if github_token else None
-        self.mi_calculator = MaintainabilityIndexCalculator()
-        self.code_storage = {}  # Store code blocks: {code_id: code_string}
+        self.code_storage = {}  # Store code blocks: {code_id: CodeRecord}
         self.code_counter = 0  # Counter for generating unique code IDs
+        self._row_buffer = []  # CSV rows not yet written (see _flush_rows)
+        self._gh_futures = {}  # Pending GitHub attribute fetches by repository
+        self._prefetch_github = False  # Fetch attributes as repositories are submitted
         self.skip_github = skip_github or not github_token
 
+        # Column values shared by every summary row and every row without GitHub data
+        self._empty_tm_values = self._tm_values(self.terrametric_runner._empty_metrics())
+        empty_gh = self.github_fetcher._empty_attributes() if self.github_fetcher else {}
+        self._empty_gh_values = tuple(empty_gh.get(field, "") for field in self.GH_FIELDS)
+
         # Check TerraMetric installation
         if not self.terrametric_runner.check_installation():
             print("[WARNING] TerraMetric not found. Metrics will be empty.")
@@ -844,6 +1544,8 @@ class DatasetBuilder:
         else:
             self.use_terrametric = True
             print("[INFO] TerraMetric found and ready.")
+            if self.terrametric_runner.start_server():
+                print("[INFO] TerraMetric server started.")
 
     def build_dataset_from_list(self, repo_list_file: str, output_csv: str):
         """
@@ -853,15 +1555,17 @@ class DatasetBuilder:
             repo_list_file: Path to file containing repository names (one per line)
             output_csv: Output CSV file path
         """
+        # The list is streamed rather than held in memory; a first pass counts it
         try:
-            with open(repo_list_file, "r", encoding="utf-8") as f:
-                repositories = [line.strip() for line in f if line.strip()]
+            total = sum(1 for _ in _iter_repositories(repo_list_file))
         except FileNotFoundError:
             print(f"[ERROR] Repository list file not found: {repo_list_file}")
             return
 
-        print(f"Building dataset from {len(repositories)} repositories...")
-        self._process_repositories(repositories, output_csv)
+        print(f"Building dataset from {total} repositories...")
+        # Attributes are fetched in the background while repositories are analyzed
+        self._prefetch_github = bool(not self.skip_github and self.github_fetcher and total > 1)
+        self._process_repositories(_iter_repositories(repo_list_file), output_csv, total)
 
     def build_dataset_from_repo(self, repo_path: str, output_csv: str, repo_name: str = None):
         """
@@ -880,17 +1584,24 @@ class DatasetBuilder:
         print(f"Building dataset from single repository: {repo_name}")
 
         # Process as a single repository
-        with open(output_csv, "w", newline="", encoding="utf-8") as csvfile:
-            writer = csv.DictWriter(
+        with open(
+            output_csv, "w", newline="", encoding="utf-8", buffering=CSV_BUFFER_SIZE
+        ) as csvfile:
+            writer = csv.writer(
                 csvfile,
-                fieldnames=self.CSV_HEADERS,
                 quoting=csv.QUOTE_MINIMAL  # Let CSV module handle quoting automatically
             )
-            writer.writeheader()
+            writer.writerow(self.CSV_HEADERS)
 
             total_blocks = self._process_single_repository(
                 repo_name, repo_path, writer, idx=1, total=1
             )
+            self._flush_rows(writer)
+
+        self.terrametric_runner.close()
+        if self.github_fetcher:
+            self.github_fetcher.save_cache()
+            self.github_fetcher.close()
 
         # Save code storage to JSON file
         json_file = output_csv.replace(".csv", "_code.json")
@@ -903,59 +1614,38 @@ class DatasetBuilder:
         print(f"Code blocks saved to: {json_file}")
         print("=" * 80)
 
-    def _process_repositories(self, repositories: List[str], output_csv: str):
+    def _process_repositories(self, repositories: Iterable[str], output_csv: str, total: int):
         """Process multiple repositories and write to CSV."""
-        with open(output_csv, "w", newline="", encoding="utf-8") as csvfile:
-            writer = csv.DictWriter(
+        with open(
+            output_csv, "w", newline="", encoding="utf-8", buffering=CSV_BUFFER_SIZE
+        ) as csvfile:
+            writer = csv.writer(
                 csvfile,
-                fieldnames=self.CSV_HEADERS,
                 quoting=csv.QUOTE_MINIMAL  # Let CSV module handle quoting automatically
             )
-            writer.writeheader()
+            writer.writerow(self.CSV_HEADERS)
 
             total_blocks = 0
 
-            for idx, repo_full_name in enumerate(repositories, 1):
-                repo_dir_name = repo_full_name.replace("/", "_")
-                repo_path = os.path.join(CLONE_DIRECTORY, repo_dir_name)
+            for idx, (repo_full_name, analysis) in enumerate(
+                self._analyze_repositories(repositories, total), 1
+            ):
+                if analysis is None:
+                    continue  # Clone failed
 
-                if not os.path.isdir(repo_path):
-                    print(
-                        f"\n[{idx}/{len(repositories)}] [CLONE] {repo_full_name} - not found locally, cloning..."
-                    )
-                    # Create corpus directory if it doesn't exist
-                    os.makedirs(CLONE_DIRECTORY, exist_ok=True)
-
-                    # Clone the repository
-                    clone_url = f"https://github.com/{repo_full_name}.git"
-                    clone_cmd = ["git", "clone", clone_url, repo_path]
-
-                    try:
-                        result = subprocess.run(
-                            clone_cmd,
-                            check=True,
-                            capture_output=True,
-                            text=True,
-                            timeout=300  # 5 minute timeout
-                        )
-                        print(f"  ✓ Successfully cloned {repo_full_name}")
-                    except subprocess.TimeoutExpired:
-                        print(f"  ✗ Clone timeout for {repo_full_name} (>5 minutes)")
-                        continue
-                    except subprocess.CalledProcessError as e:
-                        print(f"  ✗ Clone failed for {repo_full_name}: {e.stderr.strip()}")
-                        continue
-                    except Exception as e:
-                        print(f"  ✗ Unexpected error cloning {repo_full_name}: {e}")
-                        continue
-
-                blocks = self._process_single_repository(
-                    repo_full_name, repo_path, writer, idx, len(repositories)
+                total_blocks += self._write_repository(
+                    repo_full_name, *analysis, writer, idx, total
                 )
-                total_blocks += blocks
 
                 if (idx % 10) == 0:
-                    print(f"  Progress: {total_blocks} total blocks so far")
+                    log.info("  Progress: %d total blocks so far", total_blocks)
+
+            self._flush_rows(writer)
+
+        self.terrametric_runner.close()
+        if self.github_fetcher:
+            self.github_fetcher.save_cache()
+            self.github_fetcher.close()
 
         # Save code storage to JSON file
         json_file = output_csv.replace(".csv", "_code.json")
@@ -963,14 +1653,74 @@ class DatasetBuilder:
 
         print("\n" + "=" * 80)
         print("Dataset building complete!")
-        print(f"Total repositories processed: {len(repositories)}")
+        print(f"Total repositories processed: {total}")
         print(f"Total code blocks extracted: {total_blocks}")
         print(f"Dataset saved to: {output_csv}")
         print(f"Code blocks saved to: {json_file}")
         print("=" * 80)
 
+    def _analyze_repositories(self, repositories: Iterable[str], total: int):
+        """
+        Clone (if needed), extract, analyze and score each repository.
+
+        Repositories are independent, so with more than one worker they are spread
+        over a process pool, each worker running its own TerraMetric. Yields one
+        (repository, analysis) pair per repository, in input order, where analysis
+        is a (blocks, tm_metrics, mi) tuple, or None if the clone failed.
+        """
+        present = _cloned_repository_dirs()
+        jobs = (
+            (name, idx, total, name.replace("/", "_") in present)
+            for idx, name in enumerate(repositories, 1)
+        )
+        if REPO_MAX_WORKERS == 1 or total == 1:
+            analyze = functools.partial(
+                _clone_and_analyze,
+                runner=self.terrametric_runner,
+                use_terrametric=self.use_terrametric,
+            )
+            yield from self._run_windowed(jobs, lambda job: job, lambda job: analyze(*job))
+            return
+
+        # Only the workers analyze; free the JVM this process started. Workers are
+        # spawned, not forked, as GitHub prefetch threads may be running here.
+        self.terrametric_runner.close()
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=REPO_MAX_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_repository_worker,
+            initargs=(self.use_terrametric,),
+        ) as executor:
+            yield from self._run_windowed(
+                jobs,
+                lambda job: executor.submit(_analyze_repository_in_worker, *job),
+                concurrent.futures.Future.result,
+            )
+
+    def _run_windowed(self, jobs: Iterable[Tuple], submit, resolve):
+        """
+        Yield (repository, resolve(submit(job))) for each job, in input order.
+
+        At most REPO_MAX_IN_FLIGHT jobs are submitted ahead of the one being
+        yielded, so memory stays bounded however long the list is, and the GitHub
+        attributes of submitted repositories are fetched in the meantime.
+        """
+        pending = collections.deque()
+        for job in jobs:
+            name = job[0]
+            if self._prefetch_github:
+                self._gh_futures.update(self.github_fetcher.prefetch([name]))
+            pending.append((name, submit(job)))
+            if len(pending) > REPO_MAX_IN_FLIGHT:
+                name, handle = pending.popleft()
+                yield name, resolve(handle)
+
+        while pending:
+            name, handle = pending.popleft()
+            yield name, resolve(handle)
+
     def _process_single_repository(
-        self, repo_name: str, repo_path: str, writer: csv.DictWriter, idx: int, total: int
+        self, repo_name: str, repo_path: str, writer: Any, idx: int, total: int
     ) -> int:
         """
         Process a single repository and write blocks to CSV.
@@ -985,61 +1735,88 @@ class DatasetBuilder:
         Returns:
             Number of blocks processed
         """
-        print(f"\n[{idx}/{total}] Processing: {repo_name}")
+        analysis = _analyze_repository(repo_path, self.terrametric_runner, self.use_terrametric)
+        return self._write_repository(repo_name, *analysis, writer, idx, total)
+
+    def _write_repository(
+        self,
+        repo_name: str,
+        blocks: List[Dict[str, Any]],
+        all_tm_metrics: List[Dict[str, Any]],
+        all_mi: List[float],
+        writer: Any,
+        idx: int,
+        total: int,
+    ) -> int:
+        """
+        Write the block and file-summary rows of an analyzed repository.
 
-        # Get GitHub attributes if available
-        gh_attrs = {}
+        Args:
+            repo_name: Repository name/identifier
+            blocks: Extracted code blocks
+            all_tm_metrics: TerraMetric metrics, one per block
+            all_mi: Maintainability Index, one per block
+            writer: CSV writer
+            idx: Current repository index
+            total: Total number of repositories
+
+        Returns:
+            Number of blocks processed
+        """
+        # Get GitHub attributes if available, prefetched when building from a list
         if not self.skip_github and self.github_fetcher:
-            gh_attrs = self.github_fetcher.get_repo_attributes(repo_name)
+            future = self._gh_futures.pop(repo_name, None)
+            if future is not None:
+                gh_attrs = future.result()
+            else:
+                gh_attrs = self.github_fetcher.get_repo_attributes(repo_name)
+            gh_values = tuple(gh_attrs.get(field, "") for field in self.GH_FIELDS)
         else:
-            gh_attrs = self.github_fetcher._empty_attributes() if self.github_fetcher else {}
+            gh_values = self._empty_gh_values
 
-        # Extract Terraform code blocks
-        extractor = TerraformCodeExtractor(repo_path)
-        blocks = extractor.extract_blocks()
-        print(f"  Extracted {len(blocks)} code blocks")
+        log.info("[%d/%d] Processing: %s (%d code blocks)", idx, total, repo_name, len(blocks))
 
-        # Group blocks by file and calculate MI for each
-        file_mi_scores = {}
-        file_blocks = {}
+        # Running per-file aggregates for the file summary rows
+        file_aggregates = {}
 
-        for block_idx, block in enumerate(blocks):
-            file_path = block["file_path"]
+        # Rows are buffered and written in bulk once enough have accumulated
+        rows = self._row_buffer
 
-            # Analyze block
-            tm_metrics = self._analyze_block(block, repo_name, block_idx)
-            mi = self.mi_calculator.calculate_mi(tm_metrics, block)
-
-            # Write block-level row
-            row = self._create_csv_row(repo_name, block, tm_metrics, mi, gh_attrs)
-            writer.writerow(row)
-
-            # Store for file-level average
-            if file_path not in file_mi_scores:
-                file_mi_scores[file_path] = []
-                file_blocks[file_path] = []
-            file_mi_scores[file_path].append(mi)
-            file_blocks[file_path].append(block)
-
-        # Write file-level summary rows
-        for file_path, mi_scores in file_mi_scores.items():
-            avg_mi = sum(mi_scores) / len(mi_scores)
-            file_row = self._create_file_summary_row(
-                repo_name, file_path, file_blocks[file_path], avg_mi, gh_attrs
-            )
-            writer.writerow(file_row)
+        for block, tm_metrics, mi in zip(blocks, all_tm_metrics, all_mi):
+            file_path = block["file_path"]
 
+            # Block-level row
+            rows.append(self._create_csv_row(repo_name, block, tm_metrics, mi, gh_values))
+
+            # Update the file-level aggregate
+            agg = file_aggregates.get(file_path)
+            if agg is None:
+                file_aggregates[file_path] = {
+                    "count": 1,
+                    "sum_mi": mi,
+                    "sum_loc": block["loc"],
+                    "min_start": block["start_line"],
+                    "max_end": block["end_line"],
+                }
+            else:
+                agg["count"] += 1
+                agg["sum_mi"] += mi
+                agg["sum_loc"] += block["loc"]
+                agg["min_start"] = min(agg["min_start"], block["start_line"])
+                agg["max_end"] = max(agg["max_end"], block["end_line"])
+
+        # File-level summary rows
+        for file_path, agg in file_aggregates.items():
+            rows.append(self._create_file_summary_row(repo_name, file_path, agg, gh_values))
+
+        if len(rows) >= CSV_FLUSH_ROWS:
+            self._flush_rows(writer)
         return len(blocks)
 
-    def _analyze_block(
-        self, block: Dict[str, Any], repo_name: str, block_idx: int
-    ) -> Dict[str, Any]:
-        """Analyze a code block with TerraMetric."""
-        if self.use_terrametric:
-            safe_repo_name = repo_name.replace("/", "_")
-            temp_file = f"temp_{safe_repo_name}_{block_idx}.tf"
-            return self.terrametric_runner.analyze_code(block["code"], temp_file)
-        return self.terrametric_runner._empty_metrics()
+    def _flush_rows(self, writer: Any):
+        """Write all buffered CSV rows with a single writerows call."""
+        writer.writerows(self._row_buffer)
+        self._row_buffer.clear()
 
     def _create_csv_row(
         self,
@@ -1047,67 +1824,80 @@ class DatasetBuilder:
         block: Dict[str, Any],
         tm_metrics: Dict[str, Any],
         mi: float,
-        gh_attrs: Dict[str, Any],
-    ) -> Dict[str, Any]:
-        """Create a CSV row from block data."""
+        gh_values: Tuple,
+    ) -> Tuple:
+        """Create a CSV row, in CSV_HEADERS order, from block data."""
         # Generate unique code ID and store the code separately
         self.code_counter += 1
         code_id = f"code_{self.code_counter:06d}"
-        self.code_storage[code_id] = {
-            "code": block["code"],
-            "repository": repo_name,
-            "file_path": block["file_path"],
-            "block_type": block["block_type"],
-            "block_name": block["block_name"],
-            "start_line": block["start_line"],
-            "end_line": block["end_line"],
-        }
+        self.code_storage[code_id] = CodeRecord(
+            block["code"],
+            repo_name,
+            block["file_path"],
+            block["block_type"],
+            block["block_name"],
+            block["start_line"],
+            block["end_line"],
+        )
 
-        return {
-            "repository": repo_name,
-            "file_path": block["file_path"],
-            "block_type": block["block_type"],
-            "block_name": block["block_name"],
-            "start_line": block["start_line"],
-            "end_line": block["end_line"],
-            "loc": block["loc"],
-            "code_id": code_id,  # Reference to code in JSON file
-            **tm_metrics,
-            "maintainability_index": mi,
-            **gh_attrs,
-        }
+        return (
+            repo_name,
+            block["file_path"],
+            block["block_type"],
+            block["block_name"],
+            block["start_line"],
+            block["end_line"],
+            block["loc"],
+            code_id,  # Reference to code in JSON file
+            *self._tm_values(tm_metrics),
+            mi,
+            *gh_values,
+        )
 
     def _create_file_summary_row(
         self,
         repo_name: str,
         file_path: str,
-        blocks: List[Dict[str, Any]],
-        avg_mi: float,
-        gh_attrs: Dict[str, Any],
-    ) -> Dict[str, Any]:
-        """Create a file-level summary row with average MI."""
-        total_loc = sum(block["loc"] for block in blocks)
-        empty_metrics = self.terrametric_runner._empty_metrics()
+        agg: Dict[str, Any],
+        gh_values: Tuple,
+    ) -> Tuple:
+        """
+        Create a file-level summary row with average MI.
 
-        return {
-            "repository": repo_name,
-            "file_path": file_path,
-            "block_type": "FILE_SUMMARY",
-            "block_name": f"{len(blocks)} blocks",
-            "start_line": min(block["start_line"] for block in blocks),
-            "end_line": max(block["end_line"] for block in blocks),
-            "loc": total_loc,
-            "code_id": "",  # No code for summary rows
-            **empty_metrics,
-            "maintainability_index": round(avg_mi, 2),
-            **gh_attrs,
-        }
+        agg holds the file's running aggregates: block count, MI and LOC sums,
+        first start line and last end line.
+        """
+        return (
+            repo_name,
+            file_path,
+            "FILE_SUMMARY",
+            f"{agg['count']} blocks",
+            agg["min_start"],
+            agg["max_end"],
+            agg["sum_loc"],
+            "",  # No code for summary rows
+            *self._empty_tm_values,
+            round(agg["sum_mi"] / agg["count"], 2),
+            *gh_values,
+        )
 
     def _save_code_storage(self, json_file: str):
-        """Save code storage dictionary to JSON file."""
-        import json
-        with open(json_file, "w", encoding="utf-8") as f:
-            json.dump(self.code_storage, f, indent=2, ensure_ascii=False)
+        """
+        Save code storage dictionary to JSON file.
+
+        Entries are serialized one at a time, so only one record is ever held as a
+        dict; the output is the same as json.dump(..., indent=2) of the whole map.
+        """
+        with open(json_file, "w", encoding="utf-8", buffering=CSV_BUFFER_SIZE) as f:
+            if not self.code_storage:
+                f.write("{}")
+            else:
+                separator = "{"
+                for code_id, record in self.code_storage.items():
+                    entry = json.dumps({code_id: record._asdict()}, indent=2, ensure_ascii=False)
+                    f.write(separator + entry[1:-2])  # Drop the entry's own outer braces
+                    separator = ","
+                f.write("\n}")
         print(f"Code blocks saved to: {json_file}")
 
 
@@ -1155,8 +1945,14 @@ Examples:
         action="store_true",
         help="Skip GitHub API calls (useful for local analysis)",
     )
+    parser.add_argument(
+        "--quiet",
+        action="store_true",
+        help="Only log warnings, not per-repository progress",
+    )
 
     args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING if args.quiet else logging.INFO, format="%(message)s")
 
     # Initialize builder
     if args.skip_github:
@@ -1,6 +1,11 @@
 import collections
 import concurrent.futures
+import heapq
+import json
+import math
 import os
+import re
+import shutil
 import subprocess
 import sys
 import threading
@@ -9,19 +14,16 @@ from datetime import datetime, timezone, timedelta
 
 import requests
 from dotenv import load_dotenv
-from dateutil.relativedelta import relativedelta
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-# Try to import GitPython and dateutil.parser, which are essential
+# Try to import dateutil, which is essential
 try:
-    import dateutil.parser
-    from git import Repo
-    from git.exc import InvalidGitRepositoryError, GitCommandError, NoSuchPathError
+    from dateutil.relativedelta import relativedelta
 except ImportError as e:
     print("-" * 50)
     print(f"ERROR: Missing essential library: {e.name}")
-    print(
-        "Please install prerequisites: pip install requests python-dateutil GitPython python-dotenv"
-    )
+    print("Please install prerequisites: pip install requests python-dateutil python-dotenv")
     print("-" * 50)
     sys.exit(1)
 
@@ -33,20 +35,76 @@ GITHUB_TOKEN = os.environ.get("GITHUB_TOKEN", "")
 OUTPUT_DIR = "output"
 REPO_LIST_FILE_C3_FILTERED = os.path.join(OUTPUT_DIR, "iac_repositories_c3_filtered.txt")
 FINAL_REPO_LIST_FILE = os.path.join(OUTPUT_DIR, "iac_repositories_final_filtered.txt")
+REPO_DETAILS_CACHE_FILE = os.path.join(OUTPUT_DIR, "repo_details_cache.json")
+ANALYSIS_CACHE_FILE = os.path.join(OUTPUT_DIR, "repo_analysis_cache.json")
 CLONE_DIRECTORY = "iac_corpus"
 TARGET_FILE_EXTENSION = ".tf"
+SKIP_DIRS = {".git", "node_modules", "vendor"}  # Not counted for C4 (nor .terraform*)
 
 # GitHub API & Search Settings
 GITHUB_API_URL_SEARCH_CODE = "https://api.github.com/search/code"
 GITHUB_API_URL_SEARCH_REPOS = "https://api.github.com/search/repositories"
 GITHUB_API_URL_REPOS = "https://api.github.com/repos"
+GITHUB_API_URL_GRAPHQL = "https://api.github.com/graphql"
 MAX_WORKERS = 10  # For concurrent API calls
+FILTER_BATCH_SIZE = 50  # Most repositories one filter task checks
+GRAPHQL_BATCH_SIZE = 50  # Repositories fetched per GraphQL request
+CLONE_MAX_WORKERS = min(16, MAX_WORKERS)  # Concurrent git clone processes in Phase 2
+ANALYSIS_MAX_WORKERS = os.cpu_count()  # Processes analyzing cloned repositories in Phase 3
+PROGRESS_INTERVAL = 0.1  # Seconds between progress line redraws
+SEARCH_MAX_WORKERS = 5  # Search requests in flight at once, across all windows and pages
+SEARCH_MAX_PAGES = 10  # GitHub's API limit (1000 results max)
+SEARCH_PER_PAGE = 100
+REPO_DETAILS_CACHE_TTL = 24 * 60 * 60  # Seconds cached details are reused without revalidation
+# The /repos/{full_name} fields the Phase 1 filters read; only these are cached
+REPO_DETAIL_FIELDS = (
+    "archived",
+    "stargazers_count",
+    "license",
+    "is_template",
+    "description",
+    "pushed_at",
+    "forks_count",
+)
+# GraphQL Repository fields requested in place of each REST field above
+GRAPHQL_DETAIL_FIELDS = {
+    "archived": "isArchived",
+    "stargazers_count": "stargazerCount",
+    "license": "licenseInfo { key }",
+    "is_template": "isTemplate",
+    "description": "description",
+    "pushed_at": "pushedAt",
+    "forks_count": "forkCount",
+}
+
+# One pooled keep-alive session for all GitHub calls, shared by the worker threads
+SESSION = requests.Session()
+SESSION.mount(
+    "https://",
+    HTTPAdapter(
+        pool_connections=MAX_WORKERS,
+        pool_maxsize=MAX_WORKERS * 2,
+        max_retries=Retry(
+            total=3, backoff_factor=1, status_forcelist=[502, 503, 504], raise_on_status=False
+        ),
+    ),
+)
+SEARCH_SEMAPHORE = threading.BoundedSemaphore(SEARCH_MAX_WORKERS)
+
+# Repository details from this and earlier runs:
+# {repo: {"etag": ..., "fetched_at": ..., "details": {...} or None for a missing repository}}
+repo_details_cache = {}
+repo_details_lock = threading.Lock()
 
 # --- CRITERIA THRESHOLDS ---
 C1_MIN_MONTHLY_COMMITS = 3.0  # Relaxed from 7.0 - at least 3 commits/month
 C2_CORE_CONTRIBUTOR_THRESHOLD = 0.50  # Relaxed from 80% to 50% - top-two contributors
 C3_RECENT_PUSH_DAYS = 180  # 6 months
+# Pushes at or before this instant are more than C3_RECENT_PUSH_DAYS whole days old
+C3_CUTOFF = datetime.now(timezone.utc) - timedelta(days=C3_RECENT_PUSH_DAYS + 1)
 C4_MIN_IAC_RATIO = 0.05  # Relaxed from 11% to 5% - at least 5% IaC files
+# Phase 3 results cached under other thresholds are recomputed
+ANALYSIS_CRITERIA = [C1_MIN_MONTHLY_COMMITS, C2_CORE_CONTRIBUTOR_THRESHOLD, C4_MIN_IAC_RATIO]
 
 # Exclusion keywords for non-research projects (templates, examples, etc.)
 EXCLUSION_KEYWORDS = [
@@ -68,6 +126,8 @@ EXCLUSION_KEYWORDS = [
     "iac-demo",
     "sample",
 ]
+# One case-insensitive alternation over all keywords, matched anywhere in the text
+EXCLUSION_PATTERN = re.compile("|".join(map(re.escape, EXCLUSION_KEYWORDS)), re.IGNORECASE)
 
 # =========================================================================
 # PHASE 1: GITHUB MINING AND INITIAL FILTERING (C3, Templates)
@@ -78,7 +138,7 @@ def check_rate_limit(headers):
     """Checks the current GitHub API search rate limit status."""
     try:
         rate_limit_url = "https://api.github.com/rate_limit"
-        response = requests.get(rate_limit_url, headers=headers, timeout=10)
+        response = SESSION.get(rate_limit_url, headers=headers, timeout=10)
         response.raise_for_status()
         search_limit = response.json()["resources"]["search"]
         remaining = search_limit["remaining"]
@@ -90,6 +150,141 @@ def check_rate_limit(headers):
         return 0, 60
 
 
+def rate_limit_wait(response, headers):
+    """
+    Seconds to wait for the rate limit that applies to a response to reset.
+
+    Read from the response's X-RateLimit-Reset header; only when that is missing
+    is the /rate_limit endpoint queried. Secondary rate limits, refused while
+    budget remains, wait for Retry-After or 60 seconds.
+    """
+    retry_after = response.headers.get("Retry-After")
+    if retry_after is not None:
+        return int(retry_after)
+    if response.headers.get("X-RateLimit-Remaining", "0") != "0":
+        return 60
+
+    reset = response.headers.get("X-RateLimit-Reset")
+    if reset is None:
+        return check_rate_limit(headers)[1] + 1
+    return max(0, int(reset) - int(time.time())) + 1
+
+
+def load_repo_details_cache():
+    """Loads repository details cached by earlier runs from REPO_DETAILS_CACHE_FILE."""
+    if not os.path.exists(REPO_DETAILS_CACHE_FILE):
+        return
+    try:
+        with open(REPO_DETAILS_CACHE_FILE, "r", encoding="utf-8") as f:
+            repo_details_cache.update(json.load(f))
+    except (OSError, ValueError) as e:
+        print(f"[WARNING] Ignoring unreadable cache {REPO_DETAILS_CACHE_FILE}: {e}")
+
+
+def save_repo_details_cache():
+    """Writes the repository details cache to REPO_DETAILS_CACHE_FILE."""
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    with repo_details_lock:
+        with open(REPO_DETAILS_CACHE_FILE, "w", encoding="utf-8") as f:
+            json.dump(repo_details_cache, f)
+
+
+def fetch_repo_details(repo_full_name, headers):
+    """
+    Fetches the filter-relevant fields of /repos/{repo_full_name}.
+
+    Details cached within REPO_DETAILS_CACHE_TTL seconds are reused without a request.
+    Older entries are revalidated with their ETag; a 304 reply does not count against
+    the rate limit. Returns None for a repository that no longer exists.
+    """
+    stored = repo_details_cache.get(repo_full_name)
+    if stored and time.time() - stored["fetched_at"] < REPO_DETAILS_CACHE_TTL:
+        return stored["details"]
+
+    repo_url = f"{GITHUB_API_URL_REPOS}/{repo_full_name}"
+    request_headers = headers
+    if stored and stored.get("etag"):
+        request_headers = {**headers, "If-None-Match": stored["etag"]}
+
+    response = SESSION.get(repo_url, headers=request_headers, timeout=10)
+    if response.status_code == 403 and "rate limit exceeded" in response.text:
+        # Wait for the reset reported by the response, then retry once
+        time.sleep(rate_limit_wait(response, headers))
+        response = SESSION.get(repo_url, headers=request_headers, timeout=10)
+        if response.status_code == 403:
+            return None
+
+    if response.status_code == 304:
+        details = stored["details"]
+    elif response.status_code == 404:
+        details = None
+    else:
+        response.raise_for_status()
+        data = response.json()
+        details = {field: data.get(field) for field in REPO_DETAIL_FIELDS}
+
+    with repo_details_lock:
+        repo_details_cache[repo_full_name] = {
+            "etag": response.headers.get("ETag") or (stored or {}).get("etag", ""),
+            "fetched_at": time.time(),
+            "details": details,
+        }
+    return details
+
+
+def prefetch_repo_details(repo_names, headers):
+    """
+    Fetches the details of many repositories with batched GraphQL queries.
+
+    Each request carries up to GRAPHQL_BATCH_SIZE aliased repository lookups. Results land
+    in repo_details_cache, where fetch_repo_details finds them. Repositories with a fresh
+    cache entry are skipped; ones the query could not resolve are left to the REST fallback.
+    """
+    now = time.time()
+    pending = [
+        name
+        for name in repo_names
+        if name not in repo_details_cache
+        or now - repo_details_cache[name]["fetched_at"] >= REPO_DETAILS_CACHE_TTL
+    ]
+    selection = " ".join(
+        f"{field}: {graphql_field}" for field, graphql_field in GRAPHQL_DETAIL_FIELDS.items()
+    )
+
+    for start in range(0, len(pending), GRAPHQL_BATCH_SIZE):
+        batch = pending[start : start + GRAPHQL_BATCH_SIZE]
+        lookups = []
+        for i, repo_full_name in enumerate(batch):
+            owner, _, name = repo_full_name.partition("/")
+            lookups.append(
+                f"r{i}: repository(owner: {json.dumps(owner)}, name: {json.dumps(name)}) "
+                f"{{ {selection} }}"
+            )
+
+        try:
+            response = SESSION.post(
+                GITHUB_API_URL_GRAPHQL,
+                headers=headers,
+                json={"query": "query { " + " ".join(lookups) + " }"},
+                timeout=30,
+            )
+            response.raise_for_status()
+            data = response.json().get("data") or {}
+        except (requests.exceptions.RequestException, ValueError):
+            continue  # The whole batch falls back to REST
+
+        fetched_at = time.time()
+        with repo_details_lock:
+            for i, repo_full_name in enumerate(batch):
+                details = data.get(f"r{i}")
+                if details is not None:
+                    repo_details_cache[repo_full_name] = {
+                        "etag": "",
+                        "fetched_at": fetched_at,
+                        "details": details,
+                    }
+
+
 def get_repo_details_and_filter(repo_full_name, headers):
     """
     Fetches repository details and applies filtering following paper methodology:
@@ -102,149 +297,152 @@ def get_repo_details_and_filter(repo_full_name, headers):
     Returns: The repo_full_name if valid, None otherwise.
     """
 
-    # 1. IMMEDIATE FILTERING ON REPO NAME (Non-research)
-    repo_name_lower = repo_full_name.lower()
-    if any(keyword in repo_name_lower for keyword in EXCLUSION_KEYWORDS):
+    # 1. IMMEDIATE FILTERING ON REPO NAME (Non-research), before any request is made
+    if EXCLUSION_PATTERN.search(repo_full_name):
         return None
 
-    repo_url = f"{GITHUB_API_URL_REPOS}/{repo_full_name}"
-
     try:
-        response = requests.get(repo_url, headers=headers, timeout=10)
-        if response.status_code == 403 and "rate limit exceeded" in response.text:
+        details = fetch_repo_details(repo_full_name, headers)
+        if details is None:
             return None
 
-        response.raise_for_status()
-        details = response.json()
+        # Cheapest checks first: plain field lookups, then date parsing, then the keyword scan
 
         # 2. PAPER FILTERS: Archived, Non-starred, Non-licensed
-        if details.get("archived", False):
+        if details.get("archived"):
             return None
 
-        if details.get("stargazers_count", 0) == 0:
+        if not details.get("stargazers_count"):
             return None
 
         if not details.get("license"):
             return None
 
-        # 3. FILTERING ON DESCRIPTION/FLAGS (Non-research)
-        if details.get("is_template", False):
-            return None
-        description = details.get("description")
-        if description and any(keyword in description.lower() for keyword in EXCLUSION_KEYWORDS):
-            return None
-
-        # 4. RESEARCH CRITERIA CHECK (C3: Recent Push Event)
-        pushed_at_str = details.get("pushed_at")
-        if pushed_at_str:
-            pushed_at = dateutil.parser.isoparse(pushed_at_str)
-            time_diff = datetime.now(timezone.utc) - pushed_at
-            if time_diff.days > C3_RECENT_PUSH_DAYS:
-                return None
-        else:
+        # 3. TEMPLATE FLAG (Non-research)
+        if details.get("is_template"):
             return None
 
-        # 5. MINIMUM CONTRIBUTOR COUNT (at least 2 contributors for collaboration)
+        # 4. MINIMUM CONTRIBUTOR COUNT (at least 2 contributors for collaboration)
         # Use a lighter check: forks_count as proxy for collaboration interest
         # Actual contributor analysis happens in Phase 3 (C2 criterion)
-        if details.get("forks_count", 0) < 1:
+        if (details.get("forks_count") or 0) < 1:
             return None  # At least 1 fork suggests some collaboration interest
 
+        # 5. RESEARCH CRITERIA CHECK (C3: Recent Push Event)
+        pushed_at_str = details.get("pushed_at")
+        if not pushed_at_str:
+            return None
+        # GitHub timestamps are UTC with a "Z" suffix, which fromisoformat rejects before 3.11
+        pushed_at = datetime.fromisoformat(pushed_at_str.replace("Z", "+00:00"))
+        if pushed_at <= C3_CUTOFF:
+            return None
+
+        # 6. FILTERING ON DESCRIPTION (Non-research)
+        description = details.get("description")
+        if description and EXCLUSION_PATTERN.search(description):
+            return None
+
         return repo_full_name
 
     except requests.exceptions.RequestException:
         return None
 
 
+def fetch_search_page(headers, params):
+    """
+    Fetches one page of repository search results, waiting out 403 rate limits.
+
+    Requests are gated by SEARCH_SEMAPHORE so concurrent windows and pages share one budget.
+    Returns the decoded JSON payload.
+    """
+    while True:
+        with SEARCH_SEMAPHORE:
+            response = SESSION.get(
+                GITHUB_API_URL_SEARCH_REPOS, headers=headers, params=params, timeout=10
+            )
+
+        # The response's rate-limit headers replace polling /rate_limit per page
+        if response.status_code == 403:
+            wait_time = rate_limit_wait(response, headers)
+            print(f"  [RATE LIMIT] Waiting {wait_time}s...")
+            time.sleep(wait_time)
+            continue
+
+        response.raise_for_status()
+        return response.json()
+
+
 def search_repositories_with_sort(headers, base_query, date_range=None, sort_by="stars", order="desc"):
     """
     Searches GitHub repository API with specific sorting.
     Date qualifiers are part of the query string.
 
+    Page 1 is fetched first to learn total_count; the remaining pages are then fetched
+    concurrently.
+
     Args:
         base_query: Base search query (e.g., "terraform in:name,description")
         date_range: Date range tuple (start_date, end_date) in YYYY-MM-DD format
         sort_by: Sort parameter (stars, forks, updated, etc.)
         order: Order parameter (desc, asc)
 
-    Returns set of unique repository names from search results.
+    Returns (query, total_count, set of unique repository names); a failed first
+    page raises. Nothing is printed here, as windows are searched concurrently.
     """
     repos = set()
-    page = 1
 
-    while page <= 10:  # GitHub's API limit (1000 results max)
-        remaining_search, wait_time = check_rate_limit(headers)
+    # Build query with date range
+    query = base_query
+    if date_range:
+        start_date, end_date = date_range
+        query = f"{base_query} pushed:{start_date}..{end_date}"
 
-        if remaining_search < 1:
-            print(f"  [WAIT] Rate limit. Waiting {wait_time + 5}s...")
-            time.sleep(wait_time + 5)
-            continue
-
-        # Build query with date range
-        query = base_query
-        if date_range:
-            start_date, end_date = date_range
-            query = f"{base_query} pushed:{start_date}..{end_date}"
-
-        params = {
-            "q": query,
-            "per_page": 100,
-            "page": page,
-        }
-
-        # Only add sort/order if sort_by is provided
-        if sort_by:
-            params["sort"] = sort_by
-            params["order"] = order
-
-        try:
-            response = requests.get(
-                GITHUB_API_URL_SEARCH_REPOS, headers=headers, params=params, timeout=10
-            )
+    params = {
+        "q": query,
+        "per_page": SEARCH_PER_PAGE,
+    }
 
-            if response.status_code == 403:
-                print("  [RATE LIMIT] Waiting 60s...")
-                time.sleep(60)
+    # Only add sort/order if sort_by is provided
+    if sort_by:
+        params["sort"] = sort_by
+        params["order"] = order
+
+    data = fetch_search_page(headers, {**params, "page": 1})
+    total = data.get("total_count", 0)
+
+    # Extract unique repository names from repository search results
+    repos.update(item["full_name"] for item in data.get("items", []))
+
+    last_page = min(SEARCH_MAX_PAGES, math.ceil(total / SEARCH_PER_PAGE))
+    if last_page < 2:
+        return query, total, repos
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=SEARCH_MAX_WORKERS) as executor:
+        futures = [
+            executor.submit(fetch_search_page, headers, {**params, "page": page})
+            for page in range(2, last_page + 1)
+        ]
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                items = future.result().get("items", [])
+            except requests.exceptions.RequestException:
+                # A missing later page only loses part of the window
                 continue
+            repos.update(item["full_name"] for item in items)
 
-            response.raise_for_status()
-            data = response.json()
-            items = data.get("items", [])
-
-            if page == 1:
-                total = data.get("total_count", 0)
-                print(f"  Query: {query}")
-                print(f"  Total results: {total}")
-
-            if not items:
-                break
-
-            # Extract unique repository names from repository search results
-            for item in items:
-                repo_full_name = item["full_name"]
-                repos.add(repo_full_name)
-
-            page += 1
-            time.sleep(2)  # Delay to avoid rate limits
-
-        except requests.exceptions.RequestException as e:
-            print(f"  [ERROR] {e}")
-            break
-
-    return repos
+    return query, total, repos
 
 
-def batch_filter_repositories(repo_names, headers, lock, found_repositories):
-    """Filter a batch of repositories in parallel."""
-    valid_count = 0
+def batch_filter_repositories(repo_names, headers):
+    """Filter a batch of repositories; returns the set of those that pass."""
+    valid_repositories = set()
+    # One GraphQL request for the whole batch instead of one REST call per repository
+    prefetch_repo_details(repo_names, headers)
     for repo_name in repo_names:
         result = get_repo_details_and_filter(repo_name, headers)
         if result:
-            with lock:
-                if result not in found_repositories:
-                    found_repositories.add(result)
-                    valid_count += 1
-    return valid_count
+            valid_repositories.add(result)
+    return valid_repositories
 
 
 def phase_1_github_mining():
@@ -286,32 +484,37 @@ def phase_1_github_mining():
 
     print(f"Searching across {len(time_windows)} monthly time windows (2024-present)\n")
 
-    # Search each time window
-    for idx, (start_date, end_date) in enumerate(time_windows, 1):
-        print(f"\n=== Time Window {idx}/{len(time_windows)}: {start_date} to {end_date} ===")
+    # Search for quality Terraform repositories
+    # Using language:HCL with minimum stars for active/quality projects; the archived,
+    # template and fork qualifiers drop server-side what the Phase 1 filters would reject
+    base_query = "language:HCL stars:>=5 archived:false template:false forks:>=1"
 
-        # Search for quality Terraform repositories
-        # Using language:HCL with minimum stars for active/quality projects
-        base_query = "language:HCL stars:>=5"
-        date_range = (start_date, end_date)
-
-        try:
-            repos = search_repositories_with_sort(
+    # Search all time windows concurrently; SEARCH_SEMAPHORE bounds the requests in flight
+    with concurrent.futures.ThreadPoolExecutor(max_workers=SEARCH_MAX_WORKERS) as executor:
+        future_to_window = {
+            executor.submit(
+                search_repositories_with_sort,
                 headers,
                 base_query=base_query,
                 date_range=date_range,
                 sort_by="stars",
-                order="desc"
-            )
-            new_repos = repos - all_raw_repos
-            all_raw_repos.update(repos)
-            print(f"  Found: +{len(new_repos)} new repos (Total unique: {len(all_raw_repos)})")
-        except Exception as e:
-            print(f"  [ERROR] {e}")
+                order="desc",
+            ): (idx, date_range)
+            for idx, date_range in enumerate(time_windows, 1)
+        }
 
-        # Brief pause to respect rate limits
-        if idx < len(time_windows):
-            time.sleep(2)
+        # Windows finish in any order; each is reported whole once done, under its own index
+        for future in concurrent.futures.as_completed(future_to_window):
+            idx, (start_date, end_date) = future_to_window[future]
+            print(f"\n=== Time Window {idx}/{len(time_windows)}: {start_date} to {end_date} ===")
+            try:
+                query, total, repos = future.result()
+                print(f"  Query: {query}\n  Total results: {total}")
+                new_repos = repos - all_raw_repos
+                all_raw_repos.update(repos)
+                print(f"  Found: +{len(new_repos)} new repos (Total unique: {len(all_raw_repos)})")
+            except Exception as e:
+                print(f"  [ERROR] {e}")
 
     print(f"\n{'='*80}")
     print(f"[COLLECTED] {len(all_raw_repos)} unique repositories from code search")
@@ -323,25 +526,33 @@ def phase_1_github_mining():
 
     print("[FILTERING] Applying C3 and non-research filters in parallel...\n")
 
-    # Filter repositories
+    # Filter repositories, reusing details cached by earlier runs
+    load_repo_details_cache()
     found_repositories = set()
-    repo_list = list(all_raw_repos)
-    batch_size = 50
-    lock = threading.Lock()
+    # all_raw_repos is already deduplicated across windows; names the exclusion keywords
+    # reject need no details, so they are dropped before any batch is queued
+    repo_list = [name for name in all_raw_repos if not EXCLUSION_PATTERN.search(name)]
+    # Small candidate lists are split so that every worker gets a share
+    batch_size = max(1, min(FILTER_BATCH_SIZE, math.ceil(len(repo_list) / MAX_WORKERS)))
 
     with concurrent.futures.ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
         futures = []
         for i in range(0, len(repo_list), batch_size):
             batch = repo_list[i : i + batch_size]
-            futures.append(
-                executor.submit(batch_filter_repositories, batch, headers, lock, found_repositories)
-            )
+            futures.append(executor.submit(batch_filter_repositories, batch, headers))
 
-        completed = 0
-        for _ in concurrent.futures.as_completed(futures):
-            completed += 1
-            progress = (completed / len(futures)) * 100
-            print(f"[FILTERING] {progress:.1f}% | Valid: {len(found_repositories)}", end="\r")
+        # Each batch returns its own set; only this thread merges them, so no lock is needed
+        last_report = 0.0
+        for completed, future in enumerate(concurrent.futures.as_completed(futures), 1):
+            found_repositories |= future.result()
+            # Redraw at most every PROGRESS_INTERVAL seconds, and always for the last batch
+            now = time.monotonic()
+            if now - last_report >= PROGRESS_INTERVAL or completed == len(futures):
+                last_report = now
+                progress = (completed / len(futures)) * 100
+                print(f"[FILTERING] {progress:.1f}% | Valid: {len(found_repositories)}", end="\r")
+
+    save_repo_details_cache()
 
     print(f"\n\n{'='*80}")
     print(f"[SUMMARY] {len(found_repositories)} repositories after filtering")
@@ -349,8 +560,7 @@ def phase_1_github_mining():
 
     os.makedirs(OUTPUT_DIR, exist_ok=True)
     with open(REPO_LIST_FILE_C3_FILTERED, "w", encoding="utf-8") as f:
-        for repo in sorted(list(found_repositories)):
-            f.write(repo + "\n")
+        f.write("".join(f"{repo}\n" for repo in sorted(found_repositories)))
 
     print(f"Repository list saved to {REPO_LIST_FILE_C3_FILTERED}")
     return len(found_repositories)
@@ -360,6 +570,50 @@ def phase_1_github_mining():
 # =========================================================================
 
 
+def clone_repository(repo_full_name):
+    """
+    Clones one repository into CLONE_DIRECTORY.
+
+    Clones are partial (--filter=blob:none): the full commit history Phase 3 reads is
+    fetched, but file contents only for the checked-out HEAD, not for every past revision.
+    Falls back to a full clone only when the server rejects the partial-clone filter.
+
+    Returns: "cloned", "skipped" (already cloned) or "failed".
+    """
+    repo_dir_name = repo_full_name.replace("/", "_")
+    clone_url = f"https://github.com/{repo_full_name}.git"
+    target_path = os.path.join(CLONE_DIRECTORY, repo_dir_name)
+
+    if os.path.exists(target_path):
+        print(f"[SKIP] Already cloned: {repo_full_name}")
+        return "skipped"
+
+    print(f"[CLONE] Cloning: {repo_full_name}")
+    for clone_options in (["--filter=blob:none"], []):
+        try:
+            subprocess.run(
+                ["git", "clone", *clone_options, clone_url, target_path],
+                check=True,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+                text=True,
+                timeout=300,
+            )
+            return "cloned"
+        except subprocess.CalledProcessError as e:
+            # Drop whatever the failed attempt left behind
+            shutil.rmtree(target_path, ignore_errors=True)
+            # Missing, private or renamed repositories fail the same way without the filter
+            if not clone_options or "filter" not in (e.stderr or "").lower():
+                break
+        except subprocess.TimeoutExpired:
+            shutil.rmtree(target_path, ignore_errors=True)
+            break
+
+    print(f"[FAIL] Failed to clone: {repo_full_name}")
+    return "failed"
+
+
 def phase_2_clone_repos():
     """Reads the C3-filtered list and clones them locally."""
     print("\n--- PHASE 2: Cloning Repositories ---")
@@ -376,36 +630,13 @@ def phase_2_clone_repos():
 
     print(f"Starting to clone {len(repositories)} repositories...")
 
-    successful_clones = 0
-    skipped_clones = 0
-    failed_clones = 0
-
-    for repo_full_name in repositories:
-        repo_dir_name = repo_full_name.replace("/", "_")
-        clone_url = f"https://github.com/{repo_full_name}.git"
-        target_path = os.path.join(CLONE_DIRECTORY, repo_dir_name)
-
-        if os.path.exists(target_path):
-            print(f"[SKIP] Already cloned: {repo_full_name}")
-            successful_clones += 1
-            skipped_clones += 1
-            continue
-
-        print(f"[CLONE] Cloning: {repo_full_name}")
-        try:
-            subprocess.run(
-                ["git", "clone", clone_url, target_path],
-                check=True,
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.DEVNULL,
-                timeout=300,
-            )
-            successful_clones += 1
-        except (subprocess.CalledProcessError, subprocess.TimeoutExpired):
-            print(f"[FAIL] Failed to clone: {repo_full_name}")
-            failed_clones += 1
+    # git clone is network- and subprocess-bound, so clones run on a thread pool
+    with concurrent.futures.ThreadPoolExecutor(max_workers=CLONE_MAX_WORKERS) as executor:
+        outcomes = collections.Counter(executor.map(clone_repository, repositories))
 
-        time.sleep(0.5)
+    skipped_clones = outcomes["skipped"]
+    successful_clones = outcomes["cloned"] + skipped_clones
+    failed_clones = outcomes["failed"]
 
     print(
         f"\nCloning complete. Total: {len(repositories)} | "
@@ -421,6 +652,39 @@ def phase_2_clone_repos():
 # =========================================================================
 
 
+def count_files(root):
+    """
+    Counts the files under root and how many of them are IaC scripts.
+
+    Uses os.scandir so entries are classified without an extra stat per file, and
+    never descends into SKIP_DIRS, .terraform* or symlinked directories.
+
+    Returns: (total_files, iac_files)
+    """
+    total_files = 0
+    iac_files = 0
+    pending = [root]
+    while pending:
+        try:
+            with os.scandir(pending.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir():
+                        name = entry.name
+                        if (
+                            name not in SKIP_DIRS
+                            and not name.startswith(".terraform")
+                            and not entry.is_symlink()
+                        ):
+                            pending.append(entry.path)
+                    else:
+                        total_files += 1
+                        if entry.name.endswith(TARGET_FILE_EXTENSION):
+                            iac_files += 1
+        except OSError:
+            continue
+    return total_files, iac_files
+
+
 def analyze_repository(repo_path):
     """Analyzes a single repository against C4, C1, and C2 criteria."""
     results = {
@@ -433,14 +697,7 @@ def analyze_repository(repo_path):
     }
 
     # --- C4: Ratio of IaC scripts ---
-    total_files = 0
-    iac_files = 0
-    for _, _, files in os.walk(repo_path):
-        for file in files:
-            total_files += 1
-            if file.endswith(TARGET_FILE_EXTENSION):
-                iac_files += 1
-
+    total_files, iac_files = count_files(repo_path)
     iac_ratio = iac_files / total_files if total_files else 0
     if iac_ratio < C4_MIN_IAC_RATIO:
         results["C4_Fail"] = True
@@ -448,25 +705,33 @@ def analyze_repository(repo_path):
     results["C4_Pass"] = True
 
     # --- Start Git History Analysis (C1, C2) ---
+    # One "author-email<TAB>commit-timestamp" line per commit reachable from HEAD, newest first
     try:
-        repo = Repo(repo_path)
-    except (InvalidGitRepositoryError, GitCommandError, NoSuchPathError):
+        log_output = subprocess.run(
+            ["git", "-C", repo_path, "log", "--format=%ae%x09%ct"],
+            capture_output=True,
+            check=True,
+        ).stdout
+    except (subprocess.CalledProcessError, OSError):
         return results  # Fails implicit internal checks
 
-    all_commits = list(repo.iter_commits())
-    if len(all_commits) < 2:
+    author_emails = []
+    commit_times = []
+    for line in log_output.splitlines():
+        email, _, timestamp = line.rpartition(b"\t")
+        author_emails.append(email)
+        commit_times.append(int(timestamp))
+
+    if len(commit_times) < 2:
         return results  # Fails implicit internal checks
 
-    try:
-        first_commit_date = all_commits[-1].committed_datetime.replace(tzinfo=timezone.utc)
-        last_commit_date = all_commits[0].committed_datetime.replace(tzinfo=timezone.utc)
-    except AttributeError:
-        return results
+    first_commit_date = datetime.fromtimestamp(commit_times[-1], timezone.utc)
+    last_commit_date = datetime.fromtimestamp(commit_times[0], timezone.utc)
 
     time_span_months = (last_commit_date - first_commit_date).days / 30.44
 
     # --- C1: Commit frequency ---
-    total_commits = len(all_commits)
+    total_commits = len(commit_times)
     avg_monthly_commits = total_commits / time_span_months if time_span_months > 0 else 0
 
     if avg_monthly_commits < C1_MIN_MONTHLY_COMMITS:
@@ -475,20 +740,16 @@ def analyze_repository(repo_path):
     results["C1_Pass"] = True
 
     # --- C2: Core Contributors ---
-    contributor_commits = collections.Counter(c.author.email for c in all_commits)
-    total_contributor_commits = sum(contributor_commits.values())
+    contributor_commits = collections.Counter(author_emails)
 
     if len(contributor_commits) < 2:
         results["C2_Fail"] = True
         return results
 
-    sorted_contributors = contributor_commits.most_common()
-    if total_contributor_commits == 0:
-        results["C2_Fail"] = True
-        return results
-
-    top_two_commits = sorted_contributors[0][1] + sorted_contributors[1][1]
-    top_two_ratio = top_two_commits / total_contributor_commits
+    # Every commit has one author, so the counts sum to the commit count; only the two
+    # largest are needed, not a full sort
+    top_two_commits = sum(heapq.nlargest(2, contributor_commits.values()))
+    top_two_ratio = top_two_commits / total_commits
 
     if top_two_ratio < C2_CORE_CONTRIBUTOR_THRESHOLD:
         results["C2_Fail"] = True
@@ -498,6 +759,30 @@ def analyze_repository(repo_path):
     return results
 
 
+def analyze_repository_cached(repo_path, stored):
+    """
+    Analyzes a repository unless stored holds results for its current HEAD.
+
+    Args:
+        stored: Cache entry from an earlier run ({"head", "criteria", "results"}) or None
+
+    Returns: (head, results); head is None when it could not be read.
+    """
+    try:
+        head = subprocess.run(
+            ["git", "-C", repo_path, "rev-parse", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (subprocess.CalledProcessError, OSError):
+        return None, analyze_repository(repo_path)
+
+    if stored and stored["head"] == head and stored["criteria"] == ANALYSIS_CRITERIA:
+        return head, stored["results"]
+    return head, analyze_repository(repo_path)
+
+
 def phase_3_deep_analysis():
     """Performs deep analysis and generates the final exclusion report."""
     print("\n--- PHASE 3: Deep Analysis and Final Filtering (C4, C1, C2) ---")
@@ -520,23 +805,50 @@ def phase_3_deep_analysis():
 
     print(f"Analyzing {initial_count} projects for C4, C1, C2 maturity criteria...")
 
+    # Skip repositories whose cloning failed in Phase 2
+    cloned = []
     for repo_full_name in initial_repositories:
-        repo_dir_name = repo_full_name.replace("/", "_")
-        repo_path = os.path.join(CLONE_DIRECTORY, repo_dir_name)
+        repo_path = os.path.join(CLONE_DIRECTORY, repo_full_name.replace("/", "_"))
+        if os.path.isdir(repo_path):
+            cloned.append((repo_full_name, repo_path))
 
-        # Skip if cloning failed in Phase 2
-        if not os.path.isdir(repo_path):
-            continue
-
-        results = analyze_repository(repo_path)
+    # Results of earlier runs: {repo_path: {"head": ..., "criteria": [...], "results": {...}}}
+    analysis_cache = {}
+    if os.path.exists(ANALYSIS_CACHE_FILE):
+        try:
+            with open(ANALYSIS_CACHE_FILE, "r", encoding="utf-8") as f:
+                analysis_cache = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"[WARNING] Ignoring unreadable cache {ANALYSIS_CACHE_FILE}: {e}")
+
+    # Repositories are independent, so they are analyzed in parallel; map keeps list order
+    with concurrent.futures.ProcessPoolExecutor(max_workers=ANALYSIS_MAX_WORKERS) as executor:
+        all_results = executor.map(
+            analyze_repository_cached,
+            [repo_path for _, repo_path in cloned],
+            [analysis_cache.get(repo_path) for _, repo_path in cloned],
+            chunksize=4,
+        )
+
+        for (repo_full_name, repo_path), (head, results) in zip(cloned, all_results):
+            if head is not None:
+                analysis_cache[repo_path] = {
+                    "head": head,
+                    "criteria": ANALYSIS_CRITERIA,
+                    "results": results,
+                }
+
+            # Sequential check for reporting purposes
+            if results["C4_Pass"]:
+                repos_after_c4.append(repo_full_name)
+                if results["C1_Pass"]:
+                    repos_after_c1.append(repo_full_name)
+                    if results["C2_Pass"]:
+                        valid_repos.append(repo_full_name)
 
-        # Sequential check for reporting purposes
-        if results["C4_Pass"]:
-            repos_after_c4.append(repo_full_name)
-            if results["C1_Pass"]:
-                repos_after_c1.append(repo_full_name)
-                if results["C2_Pass"]:
-                    valid_repos.append(repo_full_name)
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    with open(ANALYSIS_CACHE_FILE, "w", encoding="utf-8") as f:
+        json.dump(analysis_cache, f)
 
     # --- Calculation of Exclusions ---
 
@@ -556,8 +868,7 @@ def phase_3_deep_analysis():
 
     # --- FINAL FILE & REPORT ---
     with open(FINAL_REPO_LIST_FILE, "w", encoding="utf-8") as f:
-        for repo in sorted(valid_repos):
-            f.write(repo + "\n")
+        f.write("".join(f"{repo}\n" for repo in sorted(valid_repos)))
 
     print("\n\n" + "=" * 80)
     print("                 FINAL DATA CURATION REPORT FOR IaC STUDY")